@@ -0,0 +1,54 @@
+"""content full-text and fuzzy search
+
+Revision ID: 8f2d5b6c1a47
+Revises: 4c1e7a2b9d03
+Create Date: 2026-10-19 09:30:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8f2d5b6c1a47"
+down_revision: Union[str, None] = "4c1e7a2b9d03"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DOCUMENT = "coalesce(content, '') || ' ' || coalesce(message, '')"
+SEARCH_VECTOR = f"to_tsvector('russian'::regconfig, {DOCUMENT}) || to_tsvector('simple'::regconfig, {DOCUMENT})"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.add_column(
+        "content",
+        sa.Column("search_vector", postgresql.TSVECTOR(), sa.Computed(SEARCH_VECTOR, persisted=True), nullable=True),
+    )
+    op.create_index("ix_content_search_vector", "content", ["search_vector"], postgresql_using="gin")
+    op.create_index(
+        "ix_content_content_trgm",
+        "content",
+        ["content"],
+        postgresql_using="gin",
+        postgresql_ops={"content": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_content_message_trgm",
+        "content",
+        ["message"],
+        postgresql_using="gin",
+        postgresql_ops={"message": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_content_message_trgm", table_name="content")
+    op.drop_index("ix_content_content_trgm", table_name="content")
+    op.drop_index("ix_content_search_vector", table_name="content")
+    op.drop_column("content", "search_vector")
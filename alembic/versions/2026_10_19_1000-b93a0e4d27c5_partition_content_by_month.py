@@ -0,0 +1,119 @@
+"""partition content by month of created_at
+
+Revision ID: b93a0e4d27c5
+Revises: 8f2d5b6c1a47
+Create Date: 2026-10-19 10:00:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b93a0e4d27c5"
+down_revision: Union[str, None] = "8f2d5b6c1a47"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DOCUMENT = "coalesce(content, '') || ' ' || coalesce(message, '')"
+SEARCH_VECTOR = f"to_tsvector('russian'::regconfig, {DOCUMENT}) || to_tsvector('simple'::regconfig, {DOCUMENT})"
+COLUMNS = "id, created_at, updated_at, content, step_number, message, user_id"
+MONTHS_AHEAD = 3
+
+CREATE_CONTENT = f"""
+CREATE TABLE content (
+    content VARCHAR NOT NULL,
+    step_number INTEGER NOT NULL,
+    message VARCHAR NOT NULL,
+    user_id UUID NOT NULL REFERENCES "user" (id),
+    id UUID NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE,
+    search_vector TSVECTOR GENERATED ALWAYS AS ({SEARCH_VECTOR}) STORED,
+    {{primary_key}}
+){{partition_by}}
+"""
+
+# Monthly partitions from the oldest existing row up to MONTHS_AHEAD months from now
+CREATE_PARTITIONS = f"""
+DO $$
+DECLARE
+    month date := date_trunc('month', coalesce((SELECT min(created_at) FROM content_unpartitioned), now()) AT TIME ZONE 'UTC')::date;
+    last_month date := (date_trunc('month', now() AT TIME ZONE 'UTC') + interval '{MONTHS_AHEAD} months')::date;
+BEGIN
+    WHILE month <= last_month LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF content FOR VALUES FROM (%L) TO (%L)',
+            'content_p' || to_char(month, 'YYYY_MM'),
+            month::text || ' 00:00:00+00',
+            (month + interval '1 month')::date::text || ' 00:00:00+00'
+        );
+        month := (month + interval '1 month')::date;
+    END LOOP;
+END $$;
+"""
+
+
+def create_search_indexes() -> None:
+    op.create_index("ix_content_search_vector", "content", ["search_vector"], postgresql_using="gin")
+    op.create_index(
+        "ix_content_content_trgm",
+        "content",
+        ["content"],
+        postgresql_using="gin",
+        postgresql_ops={"content": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_content_message_trgm",
+        "content",
+        ["message"],
+        postgresql_using="gin",
+        postgresql_ops={"message": "gin_trgm_ops"},
+    )
+
+
+def drop_search_indexes() -> None:
+    op.drop_index("ix_content_message_trgm", table_name="content")
+    op.drop_index("ix_content_content_trgm", table_name="content")
+    op.drop_index("ix_content_search_vector", table_name="content")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    drop_search_indexes()
+    op.execute("ALTER TABLE content RENAME TO content_unpartitioned")
+    op.execute("ALTER TABLE content_unpartitioned RENAME CONSTRAINT content_pkey TO content_unpartitioned_pkey")
+    op.execute(
+        CREATE_CONTENT.format(
+            primary_key="PRIMARY KEY (id, created_at)",
+            partition_by=" PARTITION BY RANGE (created_at)",
+        )
+    )
+    op.execute(CREATE_PARTITIONS)
+    op.execute(f"INSERT INTO content ({COLUMNS}) SELECT {COLUMNS} FROM content_unpartitioned")
+    op.drop_table("content_unpartitioned")
+    create_search_indexes()
+
+    op.create_table(
+        "archived_row",
+        sa.Column("table_name", sa.String(length=63), nullable=False),
+        sa.Column("row_id", sa.Uuid(), nullable=False),
+        sa.Column("object_name", sa.String(), nullable=False),
+        sa.Column("archived_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("table_name", "row_id"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema. Rows that are already archived stay in the archive bucket."""
+    op.drop_table("archived_row")
+
+    drop_search_indexes()
+    op.execute("ALTER TABLE content RENAME TO content_partitioned")
+    op.execute("ALTER TABLE content_partitioned RENAME CONSTRAINT content_pkey TO content_partitioned_pkey")
+    op.execute(CREATE_CONTENT.format(primary_key="PRIMARY KEY (id)", partition_by=""))
+    op.execute(f"INSERT INTO content ({COLUMNS}) SELECT {COLUMNS} FROM content_partitioned")
+    op.drop_table("content_partitioned")
+    create_search_indexes()
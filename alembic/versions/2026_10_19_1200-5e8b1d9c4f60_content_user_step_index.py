@@ -0,0 +1,27 @@
+"""content user and step index
+
+Revision ID: 5e8b1d9c4f60
+Revises: d07c3f8e5a21
+Create Date: 2026-10-19 12:00:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5e8b1d9c4f60"
+down_revision: Union[str, None] = "d07c3f8e5a21"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index("ix_content_user_id_step_number", "content", ["user_id", "step_number"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_content_user_id_step_number", table_name="content")
@@ -0,0 +1,145 @@
+"""content step statistics maintained by triggers
+
+Revision ID: a6c4e2f7b318
+Revises: 5e8b1d9c4f60
+Create Date: 2026-10-19 13:00:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a6c4e2f7b318"
+down_revision: Union[str, None] = "5e8b1d9c4f60"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INSERT_CHANGES = "SELECT step_number, user_id, created_at, 1 AS delta FROM new_rows"
+DELETE_CHANGES = "SELECT step_number, user_id, created_at, -1 AS delta FROM old_rows"
+
+APPLY_CHANGES = """
+WITH changes AS ({changes}),
+user_deltas AS (
+    SELECT step_number, user_id, sum(delta) AS delta
+    FROM changes
+    GROUP BY step_number, user_id
+    HAVING sum(delta) <> 0
+),
+users AS (
+    INSERT INTO content_step_user AS t (step_number, user_id, submissions)
+    SELECT step_number, user_id, delta FROM user_deltas ORDER BY step_number, user_id
+    ON CONFLICT (step_number, user_id) DO UPDATE SET submissions = t.submissions + excluded.submissions
+    RETURNING t.step_number, t.user_id, t.submissions
+),
+totals AS (
+    INSERT INTO content_step_totals AS t (step_number, users, submissions)
+    SELECT
+        users.step_number,
+        sum(
+            CASE
+                WHEN users.submissions > 0 AND users.submissions - user_deltas.delta <= 0 THEN 1
+                WHEN users.submissions <= 0 AND users.submissions - user_deltas.delta > 0 THEN -1
+                ELSE 0
+            END
+        ),
+        sum(user_deltas.delta)
+    FROM users JOIN user_deltas USING (step_number, user_id)
+    GROUP BY users.step_number
+    ORDER BY users.step_number
+    ON CONFLICT (step_number) DO UPDATE
+    SET users = t.users + excluded.users, submissions = t.submissions + excluded.submissions
+)
+INSERT INTO content_step_daily AS t (step_number, day, submissions)
+SELECT step_number, (created_at AT TIME ZONE 'UTC')::date, sum(delta)
+FROM changes
+GROUP BY 1, 2
+HAVING sum(delta) <> 0
+ORDER BY 1, 2
+ON CONFLICT (step_number, day) DO UPDATE SET submissions = t.submissions + excluded.submissions
+"""
+
+TRIGGER_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION content_step_stats() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        {APPLY_CHANGES.format(changes=INSERT_CHANGES)};
+    ELSIF TG_OP = 'DELETE' THEN
+        {APPLY_CHANGES.format(changes=DELETE_CHANGES)};
+    ELSE
+        {APPLY_CHANGES.format(changes=f"{INSERT_CHANGES} UNION ALL {DELETE_CHANGES}")};
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+TRIGGERS = {
+    "INSERT": "REFERENCING NEW TABLE AS new_rows",
+    "UPDATE": "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows",
+    "DELETE": "REFERENCING OLD TABLE AS old_rows",
+}
+
+# Runs while the triggers hold their lock on content, so no write is counted twice or missed
+BACKFILL = [
+    """
+    INSERT INTO content_step_user (step_number, user_id, submissions)
+    SELECT step_number, user_id, count(*) FROM content GROUP BY step_number, user_id
+    """,
+    """
+    INSERT INTO content_step_totals (step_number, users, submissions)
+    SELECT step_number, count(*), sum(submissions) FROM content_step_user GROUP BY step_number
+    """,
+    """
+    INSERT INTO content_step_daily (step_number, day, submissions)
+    SELECT step_number, (created_at AT TIME ZONE 'UTC')::date, count(*) FROM content GROUP BY 1, 2
+    """,
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "content_step_totals",
+        sa.Column("step_number", sa.Integer(), nullable=False),
+        sa.Column("users", sa.Integer(), nullable=False),
+        sa.Column("submissions", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("step_number"),
+    )
+    op.create_table(
+        "content_step_daily",
+        sa.Column("step_number", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("submissions", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("step_number", "day"),
+    )
+    op.create_index("ix_content_step_daily_day", "content_step_daily", ["day"])
+    op.create_table(
+        "content_step_user",
+        sa.Column("step_number", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Uuid(), nullable=False),
+        sa.Column("submissions", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("step_number", "user_id"),
+    )
+
+    op.execute(TRIGGER_FUNCTION)
+    for event, referencing in TRIGGERS.items():
+        op.execute(
+            f"CREATE TRIGGER content_step_stats_{event.lower()} AFTER {event} ON content "
+            f"{referencing} FOR EACH STATEMENT EXECUTE FUNCTION content_step_stats()"
+        )
+    for statement in BACKFILL:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for event in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS content_step_stats_{event.lower()} ON content")
+    op.execute("DROP FUNCTION IF EXISTS content_step_stats()")
+    op.drop_table("content_step_user")
+    op.drop_index("ix_content_step_daily_day", table_name="content_step_daily")
+    op.drop_table("content_step_daily")
+    op.drop_table("content_step_totals")
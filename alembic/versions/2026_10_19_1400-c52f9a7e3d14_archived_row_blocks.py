@@ -0,0 +1,30 @@
+"""archived row blocks
+
+Revision ID: c52f9a7e3d14
+Revises: a6c4e2f7b318
+Create Date: 2026-10-19 14:00:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c52f9a7e3d14"
+down_revision: Union[str, None] = "a6c4e2f7b318"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("archived_row", sa.Column("block_offset", sa.BigInteger(), nullable=True))
+    op.add_column("archived_row", sa.Column("block_length", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("archived_row", "block_length")
+    op.drop_column("archived_row", "block_offset")
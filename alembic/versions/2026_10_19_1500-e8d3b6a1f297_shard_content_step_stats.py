@@ -0,0 +1,136 @@
+"""shard content step totals and daily counts by slot
+
+Revision ID: e8d3b6a1f297
+Revises: c52f9a7e3d14
+Create Date: 2026-10-19 15:00:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e8d3b6a1f297"
+down_revision: Union[str, None] = "c52f9a7e3d14"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+STATS_SLOTS = 16
+
+INSERT_CHANGES = "SELECT step_number, user_id, created_at, 1 AS delta FROM new_rows"
+DELETE_CHANGES = "SELECT step_number, user_id, created_at, -1 AS delta FROM old_rows"
+
+# {slot_column} and {slot} are empty for the unsharded tables of the previous revision
+APPLY_CHANGES = """
+WITH changes AS ({changes}),
+user_deltas AS (
+    SELECT step_number, user_id, sum(delta) AS delta
+    FROM changes
+    GROUP BY step_number, user_id
+    HAVING sum(delta) <> 0
+),
+users AS (
+    INSERT INTO content_step_user AS t (step_number, user_id, submissions)
+    SELECT step_number, user_id, delta FROM user_deltas ORDER BY step_number, user_id
+    ON CONFLICT (step_number, user_id) DO UPDATE SET submissions = t.submissions + excluded.submissions
+    RETURNING t.step_number, t.user_id, t.submissions
+),
+totals AS (
+    INSERT INTO content_step_totals AS t (step_number{slot_column}, users, submissions)
+    SELECT
+        users.step_number{slot},
+        sum(
+            CASE
+                WHEN users.submissions > 0 AND users.submissions - user_deltas.delta <= 0 THEN 1
+                WHEN users.submissions <= 0 AND users.submissions - user_deltas.delta > 0 THEN -1
+                ELSE 0
+            END
+        ),
+        sum(user_deltas.delta)
+    FROM users JOIN user_deltas USING (step_number, user_id)
+    GROUP BY users.step_number
+    ORDER BY users.step_number
+    ON CONFLICT (step_number{slot_column}) DO UPDATE
+    SET users = t.users + excluded.users, submissions = t.submissions + excluded.submissions
+)
+INSERT INTO content_step_daily AS t (step_number, day{slot_column}, submissions)
+SELECT step_number, (created_at AT TIME ZONE 'UTC')::date{slot}, sum(delta)
+FROM changes
+GROUP BY 1, 2
+HAVING sum(delta) <> 0
+ORDER BY 1, 2
+ON CONFLICT (step_number, day{slot_column}) DO UPDATE SET submissions = t.submissions + excluded.submissions
+"""
+
+
+def trigger_function(sharded: bool) -> str:
+    slots = {"slot_column": "", "slot": ""}
+    if sharded:
+        slots = {"slot_column": ", slot", "slot": f", mod(pg_backend_pid(), {STATS_SLOTS})"}
+    insert = APPLY_CHANGES.format(changes=INSERT_CHANGES, **slots)
+    delete = APPLY_CHANGES.format(changes=DELETE_CHANGES, **slots)
+    update = APPLY_CHANGES.format(changes=f"{INSERT_CHANGES} UNION ALL {DELETE_CHANGES}", **slots)
+    return f"""
+CREATE OR REPLACE FUNCTION content_step_stats() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        {insert};
+    ELSIF TG_OP = 'DELETE' THEN
+        {delete};
+    ELSE
+        {update};
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+
+# Existing counts stay in slot 0, the function is replaced in the same transaction as the tables
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("content_step_totals", sa.Column("slot", sa.SmallInteger(), server_default="0", nullable=False))
+    op.alter_column("content_step_totals", "slot", server_default=None)
+    op.drop_constraint("content_step_totals_pkey", "content_step_totals", type_="primary")
+    op.create_primary_key("content_step_totals_pkey", "content_step_totals", ["step_number", "slot"])
+
+    op.add_column("content_step_daily", sa.Column("slot", sa.SmallInteger(), server_default="0", nullable=False))
+    op.alter_column("content_step_daily", "slot", server_default=None)
+    op.drop_constraint("content_step_daily_pkey", "content_step_daily", type_="primary")
+    op.create_primary_key("content_step_daily_pkey", "content_step_daily", ["step_number", "day", "slot"])
+
+    op.execute(trigger_function(sharded=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(trigger_function(sharded=False))
+
+    # Fold every slot into slot 0 before the column goes away
+    op.execute(
+        """
+        WITH moved AS (DELETE FROM content_step_totals WHERE slot <> 0 RETURNING step_number, users, submissions)
+        INSERT INTO content_step_totals AS t (step_number, slot, users, submissions)
+        SELECT step_number, 0, sum(users), sum(submissions) FROM moved GROUP BY step_number
+        ON CONFLICT (step_number, slot) DO UPDATE
+        SET users = t.users + excluded.users, submissions = t.submissions + excluded.submissions
+        """
+    )
+    op.execute(
+        """
+        WITH moved AS (DELETE FROM content_step_daily WHERE slot <> 0 RETURNING step_number, day, submissions)
+        INSERT INTO content_step_daily AS t (step_number, day, slot, submissions)
+        SELECT step_number, day, 0, sum(submissions) FROM moved GROUP BY step_number, day
+        ON CONFLICT (step_number, day, slot) DO UPDATE SET submissions = t.submissions + excluded.submissions
+        """
+    )
+
+    op.drop_constraint("content_step_daily_pkey", "content_step_daily", type_="primary")
+    op.drop_column("content_step_daily", "slot")
+    op.create_primary_key("content_step_daily_pkey", "content_step_daily", ["step_number", "day"])
+
+    op.drop_constraint("content_step_totals_pkey", "content_step_totals", type_="primary")
+    op.drop_column("content_step_totals", "slot")
+    op.create_primary_key("content_step_totals_pkey", "content_step_totals", ["step_number"])
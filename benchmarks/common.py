@@ -0,0 +1,52 @@
+import json
+import platform
+import subprocess
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def git_revision() -> str:
+    """Return short hash of the current commit or "unknown" outside of git."""
+    try:
+        output = subprocess.run(  # noqa: S603 (fixed git command, no shell)
+            ["git", "rev-parse", "--short", "HEAD"],  # noqa: S607
+            capture_output=True,
+            check=True,
+            text=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return output.stdout.strip()
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile, `fraction` is in range [0, 1]."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def save_results(name: str, results: dict[str, Any], output: Path | None = None) -> Path:
+    """Save benchmark results as JSON so they can be compared across commits."""
+    revision = git_revision()
+    if output is None:
+        output = RESULTS_DIR / f"{name}_{revision}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+
+    payload = {
+        "benchmark": name,
+        "revision": revision,
+        "created_at": datetime.now(UTC).isoformat(),
+        "python": platform.python_version(),
+        "results": results,
+    }
+    output.write_text(json.dumps(payload, indent=2, ensure_ascii=False))
+    logger.info(f"Results saved to {output}")
+    return output
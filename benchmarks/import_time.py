@@ -0,0 +1,140 @@
+"""Cold start budget check for the entry points.
+
+Runs `python -X importtime` in a fresh interpreter for every entry point. The third-party
+packages the entry point can't avoid (`requires`) are imported first, so the budget covers
+only the overhead of our own modules and of anything they import on top, and doesn't depend
+on how fast the machine imports e.g. aiogram. Also checks that heavy packages belonging to
+other entry points are not imported. Exits with a non-zero code when a budget is exceeded.
+
+Usage:
+    python -m benchmarks.import_time [--repeat 5]
+"""
+
+import argparse
+import subprocess
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from loguru import logger
+
+from benchmarks.common import save_results
+
+ROOT = Path(__file__).parent.parent
+
+
+@dataclass
+class EntryPoint:
+    module: str
+    budget_ms: float
+    requires: tuple[str, ...] = field(default_factory=tuple)
+    forbidden: tuple[str, ...] = field(default_factory=tuple)
+
+
+SETTINGS = ("pydantic_settings", "loguru")
+DATABASE = ("sqlalchemy.orm", "sqlalchemy.ext.asyncio")
+
+ENTRY_POINTS = [
+    EntryPoint(
+        "src.main",
+        budget_ms=400,
+        requires=("fastapi", "sqladmin", *DATABASE, *SETTINGS),
+        forbidden=("asyncpg", "miniopy_async"),
+    ),
+    EntryPoint(
+        "src.bot.bot",
+        budget_ms=150,
+        requires=("aiogram", *DATABASE, *SETTINGS),
+        forbidden=("sqladmin", "wtforms", "fastapi", "miniopy_async"),
+    ),
+    EntryPoint(
+        "src.database.config",
+        budget_ms=150,
+        requires=(*DATABASE, *SETTINGS),
+        forbidden=("sqladmin", "wtforms", "fastapi", "miniopy_async"),
+    ),
+    EntryPoint(
+        "src.database.base",
+        budget_ms=100,
+        requires=DATABASE,
+        forbidden=("sqladmin", "fastapi", "miniopy_async", "asyncpg"),
+    ),
+    EntryPoint(
+        "src.storage.minio",
+        budget_ms=50,
+        requires=SETTINGS,
+        forbidden=("miniopy_async", "sqlalchemy", "fastapi"),
+    ),
+]
+
+
+def measure(entry_point: EntryPoint) -> tuple[float, float, set[str]]:
+    """
+    Return import time of the required packages and the cumulative import time of the entry point
+    on top of them in ms, and the set of imported top-level packages.
+    """
+    imports = "".join(f"import {package}; " for package in entry_point.requires)
+    process = subprocess.run(  # noqa: S603 (our own interpreter and module names, no shell)
+        [sys.executable, "-X", "importtime", "-c", f"{imports}import {entry_point.module}"],
+        capture_output=True,
+        check=True,
+        cwd=ROOT,
+        text=True,
+    )
+
+    baseline_us = cumulative_us = 0
+    packages = set()
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, raw_name = line.removeprefix("import time:").split("|")
+        name = raw_name.strip()
+        packages.add(name.split(".")[0])
+        # Nested imports are indented, only top-level ones are timed from the `-c` statement
+        is_top_level = len(raw_name) - len(raw_name.lstrip()) == 1
+        if is_top_level and name in entry_point.requires:
+            baseline_us += int(cumulative)
+        if name == entry_point.module:
+            cumulative_us = int(cumulative)
+    return baseline_us / 1000, cumulative_us / 1000, packages
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="Take the best of N runs to reduce noise")
+    parser.add_argument("--output", type=Path, default=None, help="Where to save JSON results")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    results = {}
+    failed = False
+
+    for entry_point in ENTRY_POINTS:
+        runs = [measure(entry_point) for _ in range(args.repeat)]
+        baseline_ms = min(baseline for baseline, _, _ in runs)
+        best_ms = min(elapsed for _, elapsed, _ in runs)
+        leaked = sorted(set(entry_point.forbidden) & runs[0][2])
+
+        ok = best_ms <= entry_point.budget_ms and not leaked
+        failed = failed or not ok
+        results[entry_point.module] = {
+            "required_imports_ms": baseline_ms,
+            "import_ms": best_ms,
+            "budget_ms": entry_point.budget_ms,
+            "forbidden_imports": leaked,
+            "ok": ok,
+        }
+        log = logger.info if ok else logger.error
+        log(
+            f"{entry_point.module}: {best_ms:.1f}ms over {baseline_ms:.1f}ms of required imports "
+            f"(budget {entry_point.budget_ms:.0f}ms) forbidden imports: {leaked}"
+        )
+
+    save_results("import_time", results, args.output)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,16 @@
+from datetime import datetime
 from typing import TYPE_CHECKING, Any
+from uuid import UUID, uuid4
 
 from sqladmin import ModelView
-from wtforms import FileField
+from sqlalchemy import Select, exists, select
+from starlette.requests import Request
+from wtforms import FileField, StringField, validators
 
+from src.database.config import Query, dbconfig
 from src.database.models import Content, User
-from src.storage.minio import upload_file
+from src.storage.minio import delete_file, object_name_from_url, upload_file
+from src.storage.uploads import get_completed_upload_url
 
 if TYPE_CHECKING:
     from fastapi import UploadFile
@@ -49,21 +55,78 @@ class ContentAdmin(ModelView, model=Content):
         Content.created_at,
     ]
 
-    form_excluded_columns = [Content.created_at]
-
-    # Add file upload field
-    form_extra_fields = {"file": FileField("File Upload")}
-
-    async def on_model_change(self, data: dict, model: Any, is_created: bool) -> None:
-        """Handle file upload when content is created or updated."""
-        if data.get("file"):
-            file: UploadFile = data["file"]
-
-            # Generate unique object name (you might want to improve this)
+    column_searchable_list = [Content.content, Content.message]
+
+    form_excluded_columns = [Content.created_at, Content.search_vector]
+
+    # Add file upload field, large files are uploaded through the resumable /uploads API and attached by id
+    form_extra_fields = {
+        "file": FileField("File Upload"),
+        "upload_id": StringField("Resumable Upload ID", validators=[validators.Optional(), validators.UUID()]),
+    }
+
+    def _stmt_by_identifier(self, identifier: str) -> Select:
+        """
+        Content is partitioned, so its primary key is `(id, created_at)` and identifiers look like
+        `<id>;<created_at>`. sqladmin can't parse the datetime part itself. Filtering by `created_at`
+        also prunes partitions.
+        """
+        parts = dict(zip(Content.__table__.primary_key.columns.keys(), identifier.split(";"), strict=True))
+        return select(Content).where(
+            Content.id == UUID(parts["id"]),
+            Content.created_at == datetime.fromisoformat(parts["created_at"]),
+        )
+
+    async def delete_model(self, request: Request, pk: Any) -> None:
+        """Same as the default delete, but looks the row up with `_stmt_by_identifier`."""
+        async with self.session_maker() as session:
+            model = (await session.execute(self._stmt_by_identifier(pk))).scalar_one()
+            await self.on_model_delete(model, request)
+            await session.delete(model)
+            await session.commit()
+        await self.after_model_delete(model, request)
+
+    def sort_query(self, stmt: Select, request: Request) -> Select:
+        """Search results are ordered by rank in `search_query` unless a column is chosen for sorting."""
+        if request.query_params.get("search") and not request.query_params.get("sortBy"):
+            return stmt
+        return super().sort_query(stmt, request)
+
+    def search_query(self, stmt: Select, term: str) -> Select:
+        """Use full-text and trigram indexes instead of ILIKE scans, best matches first."""
+        query = Query(Content)
+        return stmt.where(query.search_condition(term)).order_by(query.search_rank(term).desc(), Content.id)
+
+    async def on_model_change(self, data: dict, model: Any, is_created: bool, request: Request) -> None:
+        """Handle file upload when content is created or updated.
+        Replaced files are left to the garbage collector, see `src.storage.gc`.
+        """
+        # Extra fields are not columns, sqladmin fails on any of them left in `data`
+        file: UploadFile | None = data.pop("file", None)
+        upload_id: str | None = data.pop("upload_id", None)
+
+        # An empty file input is still posted as an UploadFile without a name
+        if file is not None and file.filename and file.size:
+            # The id of new content is only set at flush, the object name needs it now
+            model.id = model.id or uuid4()
             object_name = f"content_{model.id}/{file.filename}"
 
             # Upload file to minio
             file_url = await upload_file(file.file, object_name)
 
             # Update content with file URL
-            model.content = file_url
+            data["content"] = model.content = file_url
+        elif upload_id:
+            data["content"] = model.content = await get_completed_upload_url(UUID(upload_id))
+
+    async def after_model_delete(self, model: Any, request: Request) -> None:
+        """Remove the file of deleted content from minio storage unless other content still uses it."""
+        object_name = object_name_from_url(model.content)
+        if object_name is None:
+            return
+
+        # Checked on the primary, a lagging replica could still show the deleted row
+        async with dbconfig.async_session_maker() as session:
+            is_shared = await session.scalar(select(exists().where(Content.content == model.content)))
+        if not is_shared:
+            await delete_file(object_name)
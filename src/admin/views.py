@@ -0,0 +1,83 @@
+from dataclasses import dataclass, field
+from datetime import UTC, date, datetime, timedelta
+
+from sqladmin import BaseView, expose
+from sqlalchemy import BigInteger, cast, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import Request
+from starlette.responses import Response
+
+from src.database.config import dbconfig
+from src.database.models import ContentStepDaily, ContentStepTotals
+
+STEPS = range(1, 21)
+
+
+@dataclass
+class StepStats:
+    step_number: int
+    days: int
+    users: int = 0
+    submissions: int = 0
+    daily: list[int] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        self.daily = self.daily or [0] * self.days
+
+
+async def get_step_stats(session: AsyncSession, days: int) -> tuple[list[date], list[StepStats]]:
+    """
+    Totals of every step and submissions per day for the last `days` days, oldest day first.
+    Only the summary tables are read and their slots summed, see `src.database.stats`.
+    """
+    today = datetime.now(UTC).date()
+    period = [today - timedelta(days=offset) for offset in reversed(range(days))]
+    stats = {step: StepStats(step, days) for step in STEPS}
+
+    # sum() of bigint is numeric in PostgreSQL, cast back so the counts stay ints
+    query = select(
+        ContentStepTotals.step_number,
+        func.sum(ContentStepTotals.users),
+        cast(func.sum(ContentStepTotals.submissions), BigInteger),
+    ).group_by(ContentStepTotals.step_number)
+    for step_number, users, submissions in await session.execute(query):
+        step = stats.setdefault(step_number, StepStats(step_number, days))
+        step.users, step.submissions = users, submissions
+
+    query = (
+        select(
+            ContentStepDaily.step_number,
+            ContentStepDaily.day,
+            cast(func.sum(ContentStepDaily.submissions), BigInteger),
+        )
+        .where(ContentStepDaily.day.between(period[0], today))
+        .group_by(ContentStepDaily.step_number, ContentStepDaily.day)
+    )
+    for step_number, day, submissions in await session.execute(query):
+        step = stats.setdefault(step_number, StepStats(step_number, days))
+        step.daily[(day - period[0]).days] = submissions
+
+    return period, sorted(stats.values(), key=lambda step: step.step_number)
+
+
+class StepStatsView(BaseView):
+    """Dashboard with users and recent submissions of every step."""
+
+    name = "Step statistics"
+    icon = "fa-solid fa-chart-column"
+
+    @expose("/step-stats", methods=["GET"])
+    async def step_stats(self, request: Request) -> Response:
+        try:
+            days = min(max(int(request.query_params.get("days", 14)), 1), 90)
+        except ValueError:
+            days = 14
+
+        async with dbconfig.read_session() as session:
+            period, steps = await get_step_stats(session, days)
+
+        return await self.templates.TemplateResponse(
+            request,
+            "step_stats.html",
+            context={"days": days, "period": period, "steps": steps},
+        )
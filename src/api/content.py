@@ -0,0 +1,146 @@
+"""Read-only JSON API for users and their step content.
+
+Every response carries a weak ETag built from the newest `updated_at`/`created_at` and the row
+count of the requested rows. The version is checked with one aggregate query before the rows
+are loaded, so a repeated poll with a matching `If-None-Match` costs an index lookup or two
+(the owner's existence is checked first, so unknown ids are 404 whatever the ETag) and
+returns 304 without a body. Rows are selected as plain columns and serialized by pydantic,
+without building ORM objects.
+"""
+
+import hashlib
+from datetime import datetime
+from typing import Any
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.dependencies import verify_api_token
+from src.config.settings import settings
+from src.database.config import dbconfig
+from src.database.models import Content, User
+
+router = APIRouter(prefix="/api", tags=["api"], dependencies=[Depends(verify_api_token)])
+
+
+class UserOut(BaseModel):
+    id: UUID
+    telegram_id: int
+    username: str | None
+    first_name: str | None
+    last_name: str | None
+    registered_at: datetime
+    created_at: datetime
+    updated_at: datetime | None
+
+
+class ContentOut(BaseModel):
+    id: UUID
+    user_id: UUID
+    step_number: int
+    content: str
+    message: str
+    created_at: datetime
+    updated_at: datetime | None
+
+
+user_adapter = TypeAdapter(UserOut)
+users_adapter = TypeAdapter(list[UserOut])
+contents_adapter = TypeAdapter(list[ContentOut])
+
+USER_COLUMNS = [getattr(User, field) for field in UserOut.model_fields]
+CONTENT_COLUMNS = [getattr(Content, field) for field in ContentOut.model_fields]
+
+
+def make_etag(last_modified: datetime | None, count: int) -> str:
+    digest = hashlib.blake2b(f"{last_modified}:{count}".encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(etag: str, if_none_match: str | None) -> bool:
+    if if_none_match is None:
+        return False
+    candidates = {candidate.strip() for candidate in if_none_match.split(",")}
+    # Weak comparison, W/ prefixes are ignored
+    return "*" in candidates or etag.removeprefix("W/") in {candidate.removeprefix("W/") for candidate in candidates}
+
+
+def cache_headers(etag: str) -> dict[str, str]:
+    max_age = settings.API_CACHE_MAX_AGE
+    return {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={max_age}, s-maxage={max_age}, stale-while-revalidate={max_age * 6}",
+        "Vary": "Authorization",
+    }
+
+
+async def get_version(session: AsyncSession, query: Select) -> tuple[str, int]:
+    """ETag and count of the rows the query selects, computed without fetching them."""
+    rows = query.subquery()
+    version = select(func.max(func.coalesce(rows.c.updated_at, rows.c.created_at)), func.count())
+    last_modified, count = (await session.execute(version.select_from(rows))).one()
+    return make_etag(last_modified, count), count
+
+
+async def conditional_response(
+    query: Select,
+    adapter: TypeAdapter[Any],
+    if_none_match: str | None,
+    one: bool = False,
+    owner: Select | None = None,
+) -> Response:
+    """
+    Respond with the rows of `query`, or 304 if `if_none_match` matches their version. Missing
+    resources are 404 before the ETag is compared: the single row for `one`, otherwise the `owner`
+    row of the collection, since an empty collection has the same ETag for every owner.
+    """
+    async with dbconfig.read_session() as session:
+        if owner is not None and await session.scalar(owner) is None:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, "Not found")
+        etag, count = await get_version(session, query)
+        if one and not count:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, "Not found")
+        if etag_matches(etag, if_none_match):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag))
+
+        rows = [dict(row) for row in (await session.execute(query)).mappings()]
+
+    if one and not rows:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Not found")
+    body = adapter.dump_json(adapter.validate_python(rows[0] if one else rows))
+    return Response(content=body, media_type="application/json", headers=cache_headers(etag))
+
+
+@router.get("/users", response_model=list[UserOut])
+async def list_users(
+    after: UUID | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+    if_none_match: str | None = Header(default=None),
+) -> Response:
+    """Users ordered by id, pass the id of the last user as `after` for the next page."""
+    query = select(*USER_COLUMNS).order_by(User.id).limit(limit)
+    if after is not None:
+        query = query.where(User.id > after)
+    return await conditional_response(query, users_adapter, if_none_match)
+
+
+@router.get("/users/{user_id}", response_model=UserOut)
+async def get_user(user_id: UUID, if_none_match: str | None = Header(default=None)) -> Response:
+    query = select(*USER_COLUMNS).where(User.id == user_id)
+    return await conditional_response(query, user_adapter, if_none_match, one=True)
+
+
+@router.get("/users/{user_id}/content", response_model=list[ContentOut])
+async def list_user_content(
+    user_id: UUID,
+    step_number: int | None = Query(None, ge=1, le=20),
+    if_none_match: str | None = Header(default=None),
+) -> Response:
+    query = select(*CONTENT_COLUMNS).where(Content.user_id == user_id).order_by(Content.step_number, Content.created_at)
+    if step_number is not None:
+        query = query.where(Content.step_number == step_number)
+    owner = select(User.id).where(User.id == user_id)
+    return await conditional_response(query, contents_adapter, if_none_match, owner=owner)
@@ -0,0 +1,22 @@
+import hmac
+
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from src.config.settings import settings
+
+bearer = HTTPBearer(auto_error=False)
+
+
+async def verify_api_token(credentials: HTTPAuthorizationCredentials | None = Depends(bearer)) -> None:
+    """Allow requests with `Authorization: Bearer <API_TOKEN>`, endpoints are closed while API_TOKEN is empty."""
+    if (
+        not settings.API_TOKEN
+        or credentials is None
+        or not hmac.compare_digest(credentials.credentials.encode(), settings.API_TOKEN.encode())
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid API token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
@@ -0,0 +1,163 @@
+import csv
+import io
+import json
+import zlib
+from collections.abc import AsyncIterator, Sequence
+from datetime import datetime
+from enum import StrEnum
+from typing import Any, Protocol
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Column, Select, Table, select
+
+from src.api.dependencies import verify_api_token
+from src.config.settings import settings
+from src.database.config import dbconfig
+from src.database.models import Content, User
+
+router = APIRouter(prefix="/export", tags=["export"], dependencies=[Depends(verify_api_token)])
+
+
+class ExportFormat(StrEnum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
+class Compression(StrEnum):
+    GZIP = "gzip"
+    ZSTD = "zstd"
+    IDENTITY = "identity"
+
+
+class Compressor(Protocol):
+    def compress(self, data: bytes, /) -> bytes: ...
+
+    def flush(self) -> bytes: ...
+
+
+class IdentityCompressor:
+    def compress(self, data: bytes, /) -> bytes:
+        return data
+
+    def flush(self) -> bytes:
+        return b""
+
+
+MEDIA_TYPES = {
+    Compression.GZIP: "application/gzip",
+    Compression.ZSTD: "application/zstd",
+    Compression.IDENTITY: "application/octet-stream",
+}
+EXTENSIONS = {Compression.GZIP: ".gz", Compression.ZSTD: ".zst", Compression.IDENTITY: ""}
+
+
+def make_compressor(compression: Compression) -> Compressor:
+    if compression is Compression.GZIP:
+        return zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    if compression is Compression.ZSTD:
+        try:
+            import zstandard
+        except ImportError as error:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="zstd compression is not available, install zstandard",
+            ) from error
+        return zstandard.ZstdCompressor().compressobj()
+    return IdentityCompressor()
+
+
+def encode_rows(rows: Sequence[Any], columns: list[str], export_format: ExportFormat) -> bytes:
+    if export_format is ExportFormat.NDJSON:
+        return "".join(json.dumps(dict(row), default=str, ensure_ascii=False) + "\n" for row in rows).encode()
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([row[column] for column in columns] for row in rows)
+    return buffer.getvalue().encode()
+
+
+def encode_header(columns: list[str], export_format: ExportFormat) -> bytes:
+    if export_format is ExportFormat.NDJSON:
+        return b""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(columns)
+    return buffer.getvalue().encode()
+
+
+async def stream_export(
+    query: Select,
+    columns: list[str],
+    export_format: ExportFormat,
+    compressor: Compressor,
+) -> AsyncIterator[bytes]:
+    """
+    Fetch rows through a server-side cursor `EXPORT_BATCH_SIZE` at a time and compress them on the fly.
+    The next batch is fetched only after the previous chunk was sent, so a slow client slows the cursor
+    down instead of filling memory.
+    """
+    async with dbconfig.read_session() as session:
+        result = await session.stream(query.execution_options(yield_per=settings.EXPORT_BATCH_SIZE))
+        yield compressor.compress(encode_header(columns, export_format))
+        async for rows in result.mappings().partitions():
+            chunk = compressor.compress(encode_rows(rows, columns, export_format))
+            if chunk:
+                yield chunk
+        yield compressor.flush()
+
+
+def export_response(
+    name: str,
+    query: Select,
+    columns: list[str],
+    export_format: ExportFormat,
+    compression: Compression,
+) -> StreamingResponse:
+    compressor = make_compressor(compression)
+    filename = f"{name}.{export_format}{EXTENSIONS[compression]}"
+    return StreamingResponse(
+        stream_export(query, columns, export_format, compressor),
+        media_type=MEDIA_TYPES[compression],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+def export_columns(table: Table) -> list[Column]:
+    """Stored columns only, generated search vectors are not exported."""
+    return [column for column in table.columns if column.computed is None]
+
+
+@router.get("/users")
+async def export_users(
+    export_format: ExportFormat = Query(ExportFormat.NDJSON, alias="format"),
+    compression: Compression = Compression.GZIP,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+) -> StreamingResponse:
+    columns = export_columns(User.__table__)  # pyright: ignore[reportArgumentType]
+    query = select(*columns)
+    if created_from is not None:
+        query = query.where(User.created_at >= created_from)
+    if created_to is not None:
+        query = query.where(User.created_at < created_to)
+    return export_response("users", query, [column.name for column in columns], export_format, compression)
+
+
+@router.get("/content")
+async def export_content(
+    export_format: ExportFormat = Query(ExportFormat.NDJSON, alias="format"),
+    compression: Compression = Compression.GZIP,
+    user_id: UUID | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+) -> StreamingResponse:
+    columns = export_columns(Content.__table__)  # pyright: ignore[reportArgumentType]
+    query = select(*columns)
+    if user_id is not None:
+        query = query.where(Content.user_id == user_id)
+    if created_from is not None:
+        query = query.where(Content.created_at >= created_from)
+    if created_to is not None:
+        query = query.where(Content.created_at < created_to)
+    return export_response("content", query, [column.name for column in columns], export_format, compression)
@@ -0,0 +1,214 @@
+"""Resumable uploads following the tus 1.0.0 protocol (creation, checksum, expiration and termination).
+
+Every PATCH chunk becomes one part of a MinIO multipart upload and the upload state is kept
+in the `upload` table, so an interrupted upload continues from `Upload-Offset` after a
+reconnect or a restart of the API. Chunks other than the last one must be at least 5 MiB,
+the minimal part size of multipart uploads.
+"""
+
+import base64
+import hashlib
+import hmac
+from datetime import UTC, datetime, timedelta
+from uuid import UUID, uuid4
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.dependencies import verify_api_token
+from src.config.settings import settings
+from src.database.config import dbconfig
+from src.database.models import Upload
+from src.storage.minio import (
+    abort_multipart_upload,
+    complete_multipart_upload,
+    create_multipart_upload,
+    upload_part,
+)
+
+TUS_VERSION = "1.0.0"
+TUS_EXTENSIONS = "creation,checksum,expiration,termination"
+CHECKSUM_ALGORITHMS = {"md5": hashlib.md5, "sha1": hashlib.sha1, "sha256": hashlib.sha256}
+MIN_PART_SIZE = 5 * 1024**2
+HTTP_460_CHECKSUM_MISMATCH = 460
+
+router = APIRouter(
+    prefix="/uploads",
+    tags=["uploads"],
+    dependencies=[Depends(verify_api_token)],
+)
+
+
+def tus_headers(**headers: str) -> dict[str, str]:
+    return {"Tus-Resumable": TUS_VERSION, "Cache-Control": "no-store", **headers}
+
+
+def expires_at(upload: Upload) -> datetime:
+    return (upload.updated_at or upload.created_at) + timedelta(hours=settings.UPLOAD_EXPIRATION_HOURS)
+
+
+def parse_metadata(metadata: str | None) -> dict[str, str]:
+    """Decode `Upload-Metadata`: comma-separated `key base64(value)` pairs."""
+    values = {}
+    for pair in (metadata or "").split(","):
+        if not pair.strip():
+            continue
+        key, _, value = pair.strip().partition(" ")
+        try:
+            values[key] = base64.b64decode(value).decode()
+        except ValueError as error:
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, f"Invalid Upload-Metadata value for {key}") from error
+    return values
+
+
+def verify_checksum(chunk: bytes, checksum: str | None) -> None:
+    """Check `Upload-Checksum: <algorithm> <base64 digest>` of the chunk."""
+    if checksum is None:
+        return
+    algorithm, _, expected = checksum.partition(" ")
+    if algorithm not in CHECKSUM_ALGORITHMS:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, f"Unsupported checksum algorithm {algorithm}")
+    actual = base64.b64encode(CHECKSUM_ALGORITHMS[algorithm](chunk).digest()).decode()
+    if not hmac.compare_digest(actual, expected):
+        raise HTTPException(HTTP_460_CHECKSUM_MISMATCH, "Checksum mismatch")
+
+
+async def read_chunk(request: Request) -> bytes:
+    chunk = bytearray()
+    async for data in request.stream():
+        chunk += data
+        if len(chunk) > settings.UPLOAD_MAX_CHUNK_SIZE:
+            raise HTTPException(status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, "Chunk is too large")
+    return bytes(chunk)
+
+
+async def get_active_upload(session: AsyncSession, upload_id: UUID, for_update: bool = False) -> Upload:
+    query = select(Upload).where(Upload.id == upload_id)
+    if for_update:
+        query = query.with_for_update()
+    upload = (await session.execute(query)).scalar_one_or_none()
+    if upload is None or (upload.completed_at is None and expires_at(upload) < datetime.now(UTC)):
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Upload not found", headers=tus_headers())
+    return upload
+
+
+@router.options("")
+async def upload_options() -> Response:
+    return Response(
+        status_code=status.HTTP_204_NO_CONTENT,
+        headers=tus_headers(
+            **{
+                "Tus-Version": TUS_VERSION,
+                "Tus-Extension": TUS_EXTENSIONS,
+                "Tus-Max-Size": str(settings.UPLOAD_MAX_SIZE),
+                "Tus-Checksum-Algorithm": ",".join(CHECKSUM_ALGORITHMS),
+            }
+        ),
+    )
+
+
+@router.post("", status_code=status.HTTP_201_CREATED)
+async def create_upload(
+    request: Request,
+    upload_length: int = Header(),
+    upload_metadata: str | None = Header(default=None),
+) -> Response:
+    if not 0 < upload_length <= settings.UPLOAD_MAX_SIZE:
+        raise HTTPException(status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, "Invalid Upload-Length")
+
+    filename = parse_metadata(upload_metadata).get("filename", "file")
+    upload_id = uuid4()
+    object_name = f"uploads/{upload_id}/{filename}"
+    multipart_upload_id = await create_multipart_upload(object_name)
+
+    async with dbconfig.async_session_maker() as session, session.begin():
+        upload = Upload(
+            id=upload_id,
+            object_name=object_name,
+            multipart_upload_id=multipart_upload_id,
+            length=upload_length,
+            upload_offset=0,
+            parts=[],
+            created_at=datetime.now(UTC),
+        )
+        session.add(upload)
+
+    return Response(
+        status_code=status.HTTP_201_CREATED,
+        headers=tus_headers(
+            **{
+                "Location": str(request.url_for("get_upload_offset", upload_id=upload_id)),
+                "Upload-Expires": expires_at(upload).strftime("%a, %d %b %Y %H:%M:%S GMT"),
+            }
+        ),
+    )
+
+
+@router.head("/{upload_id}", name="get_upload_offset")
+async def get_upload_offset(upload_id: UUID) -> Response:
+    async with dbconfig.async_session_maker() as session:
+        upload = await get_active_upload(session, upload_id)
+    return Response(
+        headers=tus_headers(
+            **{"Upload-Offset": str(upload.upload_offset), "Upload-Length": str(upload.length)},
+        ),
+    )
+
+
+@router.patch("/{upload_id}")
+async def append_chunk(
+    request: Request,
+    upload_id: UUID,
+    upload_offset: int = Header(),
+    content_type: str = Header(),
+    upload_checksum: str | None = Header(default=None),
+) -> Response:
+    if content_type != "application/offset+octet-stream":
+        raise HTTPException(status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, "Expected application/offset+octet-stream")
+
+    chunk = await read_chunk(request)
+    verify_checksum(chunk, upload_checksum)
+
+    # The row lock serializes concurrent PATCH requests of the same upload
+    async with dbconfig.async_session_maker() as session, session.begin():
+        upload = await get_active_upload(session, upload_id, for_update=True)
+        if upload.completed_at is not None or upload_offset != upload.upload_offset:
+            raise HTTPException(status.HTTP_409_CONFLICT, "Upload-Offset mismatch", headers=tus_headers())
+
+        new_offset = upload.upload_offset + len(chunk)
+        is_last = new_offset == upload.length
+        if new_offset > upload.length or not chunk or (not is_last and len(chunk) < MIN_PART_SIZE):
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, "Chunk must be at least 5 MiB unless it is the last one")
+
+        part_number = len(upload.parts) + 1
+        etag = await upload_part(
+            upload.object_name,
+            upload.multipart_upload_id,
+            part_number,
+            chunk,
+            hashlib.md5(chunk).digest(),  # noqa: S324
+        )
+        upload.parts = [*upload.parts, {"part_number": part_number, "etag": etag}]
+        upload.upload_offset = new_offset
+        upload.updated_at = datetime.now(UTC)
+
+        if is_last:
+            parts = [(part["part_number"], part["etag"]) for part in upload.parts]
+            upload.url = await complete_multipart_upload(upload.object_name, upload.multipart_upload_id, parts)
+            upload.completed_at = datetime.now(UTC)
+
+    return Response(
+        status_code=status.HTTP_204_NO_CONTENT,
+        headers=tus_headers(**{"Upload-Offset": str(new_offset)}),
+    )
+
+
+@router.delete("/{upload_id}")
+async def terminate_upload(upload_id: UUID) -> Response:
+    async with dbconfig.async_session_maker() as session, session.begin():
+        upload = await get_active_upload(session, upload_id, for_update=True)
+        if upload.completed_at is None:
+            await abort_multipart_upload(upload.object_name, upload.multipart_upload_id)
+        await session.delete(upload)
+    return Response(status_code=status.HTTP_204_NO_CONTENT, headers=tus_headers())
@@ -1,9 +1,6 @@
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
 
-from src.bot.handlers.commands import router as command_router
-from src.bot.handlers.content import router as content_router
-from src.bot.middlewares.db import DatabaseMiddleware
 from src.config.settings import settings
 
 # Replace with your bot token
@@ -15,10 +12,19 @@ async def get_bot() -> Bot:
 
 
 async def get_dispatcher() -> Dispatcher:
+    # Handlers and middlewares are imported here, so importing this module stays cheap
+    from src.bot.handlers.commands import router as command_router
+    from src.bot.handlers.content import router as content_router
+    from src.bot.middlewares.db import DatabaseMiddleware
+    from src.bot.middlewares.throttling import get_throttling_middleware
+
     dp = Dispatcher()
 
-    # Add middleware
+    # Add middleware, duplicates and floods are dropped before a database session is opened
+    throttling = get_throttling_middleware()
+    dp.update.outer_middleware(throttling)
     dp.update.middleware(DatabaseMiddleware())
+    dp["throttling_stats"] = throttling.stats
 
     # Include routers
     dp.include_router(command_router)
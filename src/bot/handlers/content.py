@@ -1,13 +1,18 @@
 from aiogram import F, Router, types
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.bot.utils.db import get_or_create_user
+from src.config.settings import settings
+from src.database.coalescer import get_content_coalescer
+from src.database.config import Query, dbconfig
 from src.database.models import Content
 
 router = Router()
 
+SEARCH_RESULTS_LIMIT = 10
+
 
 @router.message(Command("add_content"))
 async def add_content_command(message: types.Message, session: AsyncSession):
@@ -56,14 +61,17 @@ async def process_content(message: types.Message, session: AsyncSession):
             last_name=message.from_user.last_name,
         )
 
-        content = Content(
-            content=content_text,
-            step_number=step,
-            message=message_text,
-            user_id=user.id,
-        )
-        session.add(content)
-        await session.commit()
+        values = {
+            "content": content_text,
+            "step_number": step,
+            "message": message_text,
+            "user_id": user.id,
+        }
+        if settings.CONTENT_WRITE_COALESCING:
+            await get_content_coalescer().insert(values)
+        else:
+            session.add(Content(**values))
+            await session.commit()
 
         await message.answer("Контент успешно добавлен!")
 
@@ -91,8 +99,9 @@ async def list_content_command(message: types.Message, session: AsyncSession):
     )
 
     query = select(Content).where(Content.user_id == user.id).order_by(Content.step_number)
-    result = await session.execute(query)
-    contents = result.scalars().all()
+    async with dbconfig.read_session() as read_session:
+        result = await read_session.execute(query)
+        contents = result.scalars().all()
 
     if not contents:
         await message.answer("У вас пока нет добавленного контента.")
@@ -105,3 +114,39 @@ async def list_content_command(message: types.Message, session: AsyncSession):
         response += f"Сообщение: {content.message}\n\n"
 
     await message.answer(response)
+
+
+@router.message(Command("search"))
+async def search_content_command(message: types.Message, session: AsyncSession, command: CommandObject):
+    if not message.from_user:
+        await message.answer("Ошибка: не удалось получить информацию о пользователе")
+        return
+
+    if not command.args:
+        await message.answer("Пожалуйста, укажите текст для поиска: /search [запрос]")
+        return
+
+    user = await get_or_create_user(
+        session,
+        telegram_id=message.from_user.id,
+        username=message.from_user.username,
+        first_name=message.from_user.first_name,
+        last_name=message.from_user.last_name,
+    )
+
+    query = Query(Content).search(command.args, Content.user_id == user.id, limit=SEARCH_RESULTS_LIMIT)
+    async with dbconfig.read_session() as read_session:
+        result = await read_session.execute(query)
+        contents = result.scalars().all()
+
+    if not contents:
+        await message.answer("Ничего не найдено.")
+        return
+
+    response = "Найденный контент:\n\n"
+    for content in contents:
+        response += f"Шаг {content.step_number}:\n"
+        response += f"Контент: {content.content}\n"
+        response += f"Сообщение: {content.message}\n\n"
+
+    await message.answer(response)
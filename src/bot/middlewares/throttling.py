@@ -0,0 +1,155 @@
+import time
+from abc import ABC, abstractmethod
+from collections import Counter, OrderedDict
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+from aiogram.types import User as TelegramUser
+from loguru import logger
+
+from src.config.settings import settings
+
+# Token bucket refilled at ARGV[1] tokens per second up to ARGV[2] tokens, returns 1 if a token was taken
+RATE_LIMIT_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return allowed
+"""
+
+
+class ThrottlingStorage(ABC):
+    @abstractmethod
+    async def consume(self, key: str, rate: float, capacity: int) -> bool:
+        """Take a token from the bucket of `key`, False if the bucket is empty."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def mark_seen(self, update_id: int) -> bool:
+        """Remember the update, False if it was already seen."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def forget(self, update_id: int) -> None:
+        """Forget the update, so its redelivery is processed again."""
+        raise NotImplementedError
+
+
+class MemoryThrottlingStorage(ThrottlingStorage):
+    """Per-process storage, both buckets and seen updates are bounded LRU maps."""
+
+    def __init__(self, max_seen: int, max_buckets: int = 100_000) -> None:
+        self.max_buckets = max_buckets
+        self.max_seen = max_seen
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._seen: OrderedDict[int, None] = OrderedDict()
+
+    async def consume(self, key: str, rate: float, capacity: int) -> bool:
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_buckets:
+            self._buckets.popitem(last=False)
+        return allowed
+
+    async def mark_seen(self, update_id: int) -> bool:
+        if update_id in self._seen:
+            return False
+        self._seen[update_id] = None
+        if len(self._seen) > self.max_seen:
+            self._seen.popitem(last=False)
+        return True
+
+    async def forget(self, update_id: int) -> None:
+        self._seen.pop(update_id, None)
+
+
+class RedisThrottlingStorage(ThrottlingStorage):
+    """Storage shared by all bot instances, seen updates expire after `seen_ttl` seconds."""
+
+    def __init__(self, url: str, seen_ttl: int) -> None:
+        try:
+            from redis.asyncio import Redis
+        except ImportError as error:
+            raise RuntimeError("Redis throttling backend requires the redis package") from error
+
+        self.redis = Redis.from_url(url)
+        self.seen_ttl = seen_ttl
+        self._rate_limit = self.redis.register_script(RATE_LIMIT_SCRIPT)
+
+    async def consume(self, key: str, rate: float, capacity: int) -> bool:
+        return bool(await self._rate_limit(keys=[f"throttle:{key}"], args=[rate, capacity]))
+
+    async def mark_seen(self, update_id: int) -> bool:
+        return bool(await self.redis.set(f"update:{update_id}", 1, nx=True, ex=self.seen_ttl))
+
+    async def forget(self, update_id: int) -> None:
+        await self.redis.delete(f"update:{update_id}")
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Outer update middleware that drops redelivered updates and updates over the per-user rate limit
+    before any handler or database work. Counters in `stats` show how often each case happens.
+    Rate limiting is disabled when `rate` is not positive.
+    """
+
+    def __init__(self, storage: ThrottlingStorage, rate: float, burst: int) -> None:
+        self.storage = storage
+        self.rate = rate
+        self.burst = burst
+        self.stats: Counter[str] = Counter()
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        if isinstance(event, Update) and not await self.storage.mark_seen(event.update_id):
+            self.stats["duplicates"] += 1
+            logger.debug(f"Dropped redelivered update {event.update_id}")
+            return None
+
+        user: TelegramUser | None = data.get("event_from_user")
+        if self.rate > 0 and user is not None and not await self.storage.consume(str(user.id), self.rate, self.burst):
+            self.stats["throttled"] += 1
+            logger.debug(f"Throttled update from user {user.id}")
+            return None
+
+        self.stats["allowed"] += 1
+        try:
+            return await handler(event, data)
+        except Exception:
+            # Failed updates may be redelivered by Telegram and should be processed again
+            if isinstance(event, Update):
+                await self.storage.forget(event.update_id)
+            raise
+
+
+def get_throttling_middleware() -> ThrottlingMiddleware:
+    storage: ThrottlingStorage
+    if settings.BOT_THROTTLING_BACKEND == "redis":
+        storage = RedisThrottlingStorage(settings.db_url_redis, seen_ttl=settings.BOT_DEDUP_TTL)
+    else:
+        storage = MemoryThrottlingStorage(max_seen=settings.BOT_DEDUP_SIZE)
+    return ThrottlingMiddleware(storage, rate=settings.BOT_RATE_LIMIT, burst=settings.BOT_RATE_BURST)
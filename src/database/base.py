@@ -1,7 +1,8 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import DateTime, String
+from sqlalchemy import Computed, DateTime, String
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.ext.asyncio import AsyncAttrs
 from sqlalchemy.orm import DeclarativeBase, Mapped, declared_attr, mapped_column
 
@@ -16,7 +17,7 @@ class TimestampMixin:
 
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.now)
 
-    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True, onupdate=datetime.now)
 
 
 class PrimaryKeyUUID:
@@ -45,6 +46,23 @@ class Point:
     longitude: Mapped[float] = mapped_column()
 
 
+class Searchable:
+    """
+    Mixin for full-text search over the text columns listed in `__search_columns__`.
+    The generated vector combines Russian stemming with the `simple` config, which keeps
+    words the Russian dictionary doesn't know (names, English) searchable as is.
+    """
+
+    __search_columns__: tuple[str, ...] = ()
+
+    @declared_attr  # pyright: ignore[reportArgumentType]
+    @classmethod
+    def search_vector(cls) -> Mapped[str | None]:
+        document = " || ' ' || ".join(f"coalesce({column}, '')" for column in cls.__search_columns__)
+        expression = f"to_tsvector('russian'::regconfig, {document}) || to_tsvector('simple'::regconfig, {document})"
+        return mapped_column(TSVECTOR, Computed(expression, persisted=True), nullable=True, deferred=True)
+
+
 class General(Base, PrimaryKeyUUID, TimestampMixin):
     """
     Abstract base class for all models.
@@ -0,0 +1,128 @@
+import asyncio
+from datetime import UTC, datetime
+from functools import cache
+from typing import Any, Generic
+from uuid import UUID, uuid4
+
+from loguru import logger
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from src.config.settings import settings
+from src.database.config import ModelType, dbconfig
+from src.database.models import Content
+
+PendingRow = tuple[dict[str, Any], asyncio.Future[UUID]]
+
+
+class WriteCoalescer(Generic[ModelType]):
+    """
+    Group commit for inserts coming from concurrent callers.
+
+    Rows are collected for up to `max_delay` seconds or until `max_rows` are pending and
+    written as one multi-row INSERT in one transaction, so many submissions share one WAL flush.
+    Every caller awaits its own row id. If the batch fails, rows are retried one by one
+    in savepoints, so only the rows that are actually broken get an error.
+    """
+
+    def __init__(self, model: type[ModelType], max_delay: float, max_rows: int) -> None:
+        self.model = model
+        self.max_delay = max_delay
+        self.max_rows = max_rows
+        self._pending: list[PendingRow] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._writes: set[asyncio.Task] = set()
+
+    async def insert(self, values: dict[str, Any]) -> UUID:
+        """Queue a row for insertion and wait until its batch is committed."""
+        loop = asyncio.get_running_loop()
+        row = {"id": uuid4(), "created_at": datetime.now(UTC), **values}
+        future: asyncio.Future[UUID] = loop.create_future()
+        self._pending.append((row, future))
+
+        if len(self._pending) >= self.max_rows:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush)
+
+        return await future
+
+    async def close(self) -> None:
+        """Write everything that is still pending."""
+        self._flush()
+        await asyncio.gather(*self._writes)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.create_task(self._write(batch))
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+
+    async def _write(self, batch: list[PendingRow]) -> None:
+        # Every caller awaits its future, so no error may leave them pending
+        try:
+            await self._write_batch(batch)
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except BaseException as error:
+            logger.exception(f"Insert of {len(batch)} {self.model.__name__} rows failed")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            if not isinstance(error, Exception):
+                raise
+
+    async def _write_batch(self, batch: list[PendingRow]) -> None:
+        try:
+            async with dbconfig.async_session_maker() as session, session.begin():
+                await session.execute(insert(self.model).values([row for row, _ in batch]))
+        except SQLAlchemyError as error:
+            logger.warning(
+                f"Batch insert of {len(batch)} {self.model.__name__} rows failed, retrying one by one: {error!r}"
+            )
+            await self._write_one_by_one(batch)
+            return
+
+        for row, future in batch:
+            if not future.done():
+                future.set_result(row["id"])
+
+    async def _write_one_by_one(self, batch: list[PendingRow]) -> None:
+        results: list[tuple[asyncio.Future[UUID], UUID | BaseException]] = []
+        try:
+            async with dbconfig.async_session_maker() as session, session.begin():
+                for row, future in batch:
+                    try:
+                        async with session.begin_nested():
+                            await session.execute(insert(self.model).values(row))
+                    except SQLAlchemyError as error:
+                        results.append((future, error))
+                    else:
+                        results.append((future, row["id"]))
+        except SQLAlchemyError as error:
+            results = [(future, error) for _, future in batch]
+
+        for future, result in results:
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+@cache
+def get_content_coalescer() -> WriteCoalescer[Content]:
+    return WriteCoalescer(
+        Content,
+        max_delay=settings.CONTENT_COALESCE_MAX_DELAY_MS / 1000,
+        max_rows=settings.CONTENT_COALESCE_MAX_ROWS,
+    )
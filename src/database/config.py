@@ -1,15 +1,21 @@
+import asyncio
 from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator, Sequence
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
 from datetime import UTC, datetime
 from enum import Enum
+from itertools import count
+from time import monotonic
 from types import TracebackType
 from typing import Any, Generic, TypeVar
 from typing import cast as type_cast
 from uuid import UUID
 
-from fastapi import HTTPException
 from loguru import logger
 from pydantic import BaseModel
 from sqlalchemy import (
+    ColumnElement,
     ColumnExpressionArgument,
     Delete,
     Executable,
@@ -19,49 +25,229 @@ from sqlalchemy import (
     Update,
     cast,
     delete,
+    func,
     insert,
+    literal,
+    or_,
     select,
+    text,
+    tuple_,
     update,
 )
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.exc import NoResultFound, SQLAlchemyError
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
+from sqlalchemy.orm import Session
 from sqlalchemy.pool import NullPool
+from starlette.exceptions import HTTPException
 
 from src.config.settings import settings
-from src.database.base import Base, PrimaryKeyUUID
+from src.database.base import Base, PrimaryKeyUUID, Searchable
 from src.project_utils import handle_error
 
 ModelType = TypeVar("ModelType", bound=Base)
 
+# (rank, id) of the last row of a search results page
+SearchCursor = tuple[float, UUID]
+
 
 class NotCreatedSessionError(NotImplementedError): ...
 
 
+# Seconds the replica is behind the primary. A replica that has replayed everything it received
+# is up to date even when the primary is idle and the last replayed transaction is old, but only
+# while its WAL receiver is streaming and hears from the primary: a disconnected receiver stops
+# advancing, so "replayed everything received" would look up to date forever. Reading the
+# receiver status needs the pg_read_all_stats (or pg_monitor) role.
+REPLICA_LAG_QUERY = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN NOT EXISTS (
+            SELECT 1
+            FROM pg_stat_wal_receiver
+            WHERE status = 'streaming'
+              AND now() - last_msg_receipt_time
+                  < greatest(current_setting('wal_receiver_timeout')::interval, interval '1 minute')
+        ) THEN 'Infinity'
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 'Infinity')
+    END
+    """
+)
+
+
+@dataclass
+class Replica:
+    engine: AsyncEngine
+    lag: float | None = None  # None until the first successful check
+
+    @property
+    def name(self) -> str:
+        return self.engine.url.render_as_string(hide_password=True)
+
+
+class RoutingSession(Session):
+    """
+    Session that sends plain SELECTs to a healthy replica and everything else to the primary.
+    Once the session writes anything it sticks to the primary, so it always reads its own writes.
+    """
+
+    def __init__(self, *args: Any, db_config: "DatabaseConfig | None" = None, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.db_config = db_config
+        self.wrote = False
+        self._replica: AsyncEngine | None = None
+
+    def get_bind(self, mapper: Any = None, clause: Any = None, **kwargs: Any) -> Any:
+        is_read = isinstance(clause, Select) and clause._for_update_arg is None
+        if self._flushing or (clause is not None and not is_read):
+            self.wrote = True
+
+        if is_read and not self.wrote and self.db_config is not None:
+            if self._replica is None:
+                self._replica = self.db_config.replica_engine()
+            if self._replica is not None:
+                return self._replica.sync_engine
+        if self.bind is None and self.db_config is not None:
+            # Unbound sessionmakers resolve the primary on first query, not when they are created
+            return self.db_config.engine.sync_engine
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+
 class DatabaseConfig:
     def __init__(
         self,
         db_url_postgresql: str,
+        replica_urls: Sequence[str] = (),
+        max_replica_lag: float = 2.0,
+        lag_check_interval: float = 1.0,
     ) -> None:
         self.db_url_postgresql = db_url_postgresql
+        self.replica_urls = list(replica_urls)
+        self.max_replica_lag = max_replica_lag
+        self.lag_check_interval = lag_check_interval
+        self._engine: AsyncEngine | None = None
+        self._async_session_maker: async_sessionmaker[AsyncSession] | None = None
+        self._read_session_maker: async_sessionmaker[AsyncSession] | None = None
+        self._replicas: list[Replica] | None = None
+        self._replicas_checked_at = float("-inf")
+        self._next_replica = count()
 
     @property
     def engine(self) -> AsyncEngine:
-        return create_async_engine(self.db_url_postgresql, echo=settings.ECHO, poolclass=NullPool)
+        """Engine is created on first use, so importing this module never touches the driver."""
+        if self._engine is None:
+            self._engine = create_async_engine(self.db_url_postgresql, echo=settings.ECHO, poolclass=NullPool)
+        return self._engine
 
     @property
     def async_session_maker(self) -> async_sessionmaker[AsyncSession]:
+        if self._async_session_maker is None:
+            self._async_session_maker = async_sessionmaker(
+                self.engine,
+                class_=AsyncSession,
+                expire_on_commit=False,
+            )
+        return self._async_session_maker
+
+    @property
+    def read_session_maker(self) -> async_sessionmaker[AsyncSession]:
+        if self._read_session_maker is None:
+            self._read_session_maker = self.create_read_session_maker()
+        return self._read_session_maker
+
+    def create_read_session_maker(self) -> async_sessionmaker[AsyncSession]:
+        """
+        Sessions that read from replicas and write to the primary, see `RoutingSession`.
+        Creating the sessionmaker doesn't create the engine, so it can be passed around at import time.
+        Consumers that reconfigure their sessionmaker (e.g. sqladmin) should get their own one.
+        """
         return async_sessionmaker(
-            self.engine,
             class_=AsyncSession,
+            sync_session_class=RoutingSession,
             expire_on_commit=False,
+            db_config=self,
         )
 
+    @asynccontextmanager
+    async def read_session(self) -> AsyncIterator[AsyncSession]:
+        """Open a read session after making sure replica lag information is fresh."""
+        await self.check_replicas()
+        async with self.read_session_maker() as session:
+            yield session
 
-dbconfig = DatabaseConfig(settings.db_url_postgresql)
+    @property
+    def replicas(self) -> list[Replica]:
+        if self._replicas is None:
+            self._replicas = [
+                Replica(engine=create_async_engine(url, echo=settings.ECHO, poolclass=NullPool))
+                for url in self.replica_urls
+            ]
+        return self._replicas
+
+    def replica_engine(self) -> AsyncEngine | None:
+        """Next replica in round-robin order that is within the allowed lag, None to use the primary."""
+        healthy = [
+            replica for replica in self.replicas if replica.lag is not None and replica.lag <= self.max_replica_lag
+        ]
+        if not healthy:
+            return None
+        return healthy[next(self._next_replica) % len(healthy)].engine
+
+    async def check_replicas(self, force: bool = False) -> None:
+        """Refresh replica lag if the last check is older than `lag_check_interval`."""
+        if not self.replica_urls:
+            return
+        now = monotonic()
+        if not force and now - self._replicas_checked_at < self.lag_check_interval:
+            return
+        self._replicas_checked_at = now
+        await asyncio.gather(*(self._check_replica(replica) for replica in self.replicas))
+
+    async def _check_replica(self, replica: Replica) -> None:
+        try:
+            async with replica.engine.connect() as connection:
+                lag = await connection.scalar(REPLICA_LAG_QUERY)
+        except (SQLAlchemyError, OSError) as error:
+            logger.warning(f"Replica {replica.name} is unavailable, reading from primary: {error!r}")
+            replica.lag = None
+            return
+
+        replica.lag = float(lag)
+        if replica.lag > self.max_replica_lag:
+            logger.warning(f"Replica {replica.name} is {replica.lag:.1f}s behind, reading from primary")
+
+    async def monitor_replicas(self) -> None:
+        """Keep replica lag fresh for sessions opened without `read_session`, e.g. admin views."""
+        while self.replica_urls:
+            await self.check_replicas(force=True)
+            await asyncio.sleep(self.lag_check_interval)
+
+    async def dispose(self) -> None:
+        """Close engine connections, next use will create new engines."""
+        if self._engine is not None:
+            await self._engine.dispose()
+        for replica in self._replicas or []:
+            await replica.engine.dispose()
+        self._engine = None
+        self._async_session_maker = None
+        self._read_session_maker = None
+        self._replicas = None
+        self._replicas_checked_at = float("-inf")
+
+
+dbconfig = DatabaseConfig(
+    settings.db_url_postgresql,
+    replica_urls=settings.PG_REPLICA_DSNS,
+    max_replica_lag=settings.PG_REPLICA_MAX_LAG,
+    lag_check_interval=settings.PG_REPLICA_LAG_CHECK_INTERVAL,
+)
 
 
 class IUnitOfWorkBase(ABC):
@@ -85,8 +271,9 @@ class IUnitOfWorkBase(ABC):
 
 
 class PgUnitOfWork(IUnitOfWorkBase):
-    def __init__(self) -> None:
-        self._session_factory = dbconfig.async_session_maker
+    def __init__(self, use_replica: bool = False) -> None:
+        self.use_replica = use_replica
+        self._session_factory = dbconfig.read_session_maker if use_replica else dbconfig.async_session_maker
         self._async_session: AsyncSession | None = None
 
     def activate(self):
@@ -94,6 +281,8 @@ class PgUnitOfWork(IUnitOfWorkBase):
             self._async_session = self._session_factory()
 
     async def __aenter__(self):
+        if self.use_replica:
+            await dbconfig.check_replicas()
         self.activate()
         return self
 
@@ -170,6 +359,45 @@ class Query(Generic[ModelType]):
     def select(self, *condition: ColumnExpressionArgument) -> Select:
         return select(self.model).where(*condition)
 
+    def search_condition(self, term: str) -> ColumnElement[bool]:
+        """
+        Full-text match on `search_vector` or a fuzzy trigram match on any of the model `__search_columns__`.
+        Every branch is served by a GIN index.
+        """
+        model = type_cast("type[Searchable]", self.model)
+        fuzzy = [literal(term).op("<%")(getattr(model, column)) for column in model.__search_columns__]
+        return or_(model.search_vector.op("@@")(self._ts_query(term)), *fuzzy)
+
+    def search_rank(self, term: str) -> ColumnElement[float]:
+        """Text rank plus the best trigram word similarity, so typos still rank below exact matches."""
+        model = type_cast("type[Searchable]", self.model)
+        similarity = [func.word_similarity(term, getattr(model, column)) for column in model.__search_columns__]
+        return (func.ts_rank_cd(model.search_vector, self._ts_query(term)) + func.greatest(*similarity)).label("rank")
+
+    def search(
+        self,
+        term: str,
+        *condition: ColumnExpressionArgument,
+        limit: int = 20,
+        after: SearchCursor | None = None,
+    ) -> Select:
+        """
+        Ranked search, selects `(model, rank)` rows.
+        Pages are keyset-paginated: pass `(rank, id)` of the last row of the previous page as `after`.
+        """
+        model = type_cast("type[PrimaryKeyUUID]", self.model)
+        rank = self.search_rank(term)
+        query = select(self.model, rank).where(self.search_condition(term), *condition)
+        if after is not None:
+            query = query.where(tuple_(rank, model.id) < tuple_(*after))
+        return query.order_by(rank.desc(), model.id.desc()).limit(limit)
+
+    @staticmethod
+    def _ts_query(term: str) -> ColumnElement[Any]:
+        russian = func.websearch_to_tsquery(cast("russian", REGCONFIG), term)
+        simple = func.websearch_to_tsquery(cast("simple", REGCONFIG), term)
+        return russian.op("||")(simple)
+
     def make_conditions(self, conditions: BaseModel):
         """
         Make conditions for the query by pydantic model fields.
@@ -238,8 +466,9 @@ class Crud(Generic[ModelType], Query[ModelType]):
 
 class CrudEntity(Crud[ModelType]):
     def __init__(self, model: type[ModelType]):
-        self.uow = PgUnitOfWork()
         super().__init__(model=model)
+        # Reads go to a replica until the unit of work writes, then it sticks to the primary
+        self.uow = PgUnitOfWork(use_replica=True)
 
     async def get_entity(self, r_id: UUID) -> ModelType:
         model = type_cast("type[PrimaryKeyUUID]", self.model)
@@ -247,7 +476,13 @@ class CrudEntity(Crud[ModelType]):
         query = self.select(conditions)
 
         result_query = await self.uow.execute(query)
-        response = result_query.scalar_one()
+        response = result_query.scalar_one_or_none()
+        if response is None and getattr(self.model, "__archived__", False):
+            from src.storage.archive import load_archived_entity
+
+            response = await load_archived_entity(self.model, r_id)
+        if response is None:
+            raise NoResultFound("No row was found when one was required")
         return type_cast("ModelType", response)
 
     async def get_entity_by_conditions(self, conditions: BaseModel) -> ModelType:
@@ -292,6 +527,22 @@ class CrudEntity(Crud[ModelType]):
         response = result_query.scalars().fetchall()
         return type_cast("list[ModelType]", response)
 
+    async def get_by_search(
+        self,
+        term: str,
+        *condition: ColumnExpressionArgument,
+        limit: int = 20,
+        after: SearchCursor | None = None,
+    ) -> list[tuple[ModelType, float]]:
+        """Get ranked full-text and fuzzy search results
+        :param term: search phrase, web search syntax ("quoted phrase", -excluded, or)
+        :param after: (rank, id) of the last row of the previous page
+        :return: list[(self.model, rank)]
+        """
+        query = self.search(term, *condition, limit=limit, after=after)
+        result_query = await self.uow.execute(query)
+        return [(type_cast("ModelType", row[0]), row[1]) for row in result_query.all()]
+
     async def get_by_query(self, query: Executable) -> list[ModelType]:
         result_query = await self.uow.execute(query)
         response = result_query.scalars().fetchall()
@@ -1,9 +1,26 @@
-from datetime import datetime
+import uuid
+from datetime import date, datetime
+from typing import Any
 
-from sqlalchemy import BigInteger, DateTime, ForeignKey, Integer, String
+from sqlalchemy import (
+    DDL,
+    BigInteger,
+    Date,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    PrimaryKeyConstraint,
+    SmallInteger,
+    String,
+    event,
+)
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from src.database.base import General
+from src.database.base import Base, General, Searchable
+from src.database.partitions import create_partitions_on_table_create
+from src.database.stats import STEP_STATS_DDL
 
 
 class User(General):
@@ -15,9 +32,102 @@ class User(General):
     contents: Mapped[list["Content"]] = relationship(back_populates="user")
 
 
-class Content(General):
+class Content(General, Searchable):
+    """
+    Range-partitioned by month of `created_at`, so `created_at` is part of the primary key.
+    Old partitions are moved to object storage, see `src.storage.archive`.
+    """
+
+    __search_columns__ = ("content", "message")
+    __archived__ = True
+    __table_args__ = (
+        Index("ix_content_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_content_content_trgm", "content", postgresql_using="gin", postgresql_ops={"content": "gin_trgm_ops"}),
+        Index("ix_content_message_trgm", "message", postgresql_using="gin", postgresql_ops={"message": "gin_trgm_ops"}),
+        Index("ix_content_user_id_step_number", "user_id", "step_number"),
+        PrimaryKeyConstraint("id", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True, default=datetime.now)
     content: Mapped[str] = mapped_column(String)
     step_number: Mapped[int] = mapped_column(Integer)
     message: Mapped[str] = mapped_column(String)
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
+    user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("user.id"))
     user: Mapped[User] = relationship(back_populates="contents")
+
+
+class Upload(General):
+    """Resumable upload backed by a MinIO multipart upload, one part per received chunk."""
+
+    object_name: Mapped[str] = mapped_column(String)
+    multipart_upload_id: Mapped[str] = mapped_column(String)
+    length: Mapped[int] = mapped_column(BigInteger)
+    upload_offset: Mapped[int] = mapped_column(BigInteger, default=0)
+    parts: Mapped[list[dict[str, Any]]] = mapped_column(JSONB, default=list)
+    url: Mapped[str | None] = mapped_column(String, nullable=True)
+    completed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class ArchivedRow(Base):
+    """Where to find rows of partitioned tables that were moved to the archive bucket."""
+
+    __tablename__ = "archived_row"
+
+    table_name: Mapped[str] = mapped_column(String(63), primary_key=True)
+    row_id: Mapped[uuid.UUID] = mapped_column(primary_key=True)
+    object_name: Mapped[str] = mapped_column(String)
+    # Byte range of the gzip member holding the row, empty for archives written before blocks were indexed
+    block_offset: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    block_length: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    archived_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.now)
+
+
+class ContentStepTotals(Base):
+    """
+    Distinct users and submissions of each step, maintained by triggers on `content`, see `src.database.stats`.
+    A step's totals are the sums over its slots.
+    """
+
+    __tablename__ = "content_step_totals"
+
+    step_number: Mapped[int] = mapped_column(Integer, primary_key=True)
+    slot: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    users: Mapped[int] = mapped_column(Integer, default=0)
+    submissions: Mapped[int] = mapped_column(BigInteger, default=0)
+
+
+class ContentStepDaily(Base):
+    """Submissions of each step per UTC day, summed over slots like `ContentStepTotals`."""
+
+    __tablename__ = "content_step_daily"
+    __table_args__ = (Index("ix_content_step_daily_day", "day"),)
+
+    step_number: Mapped[int] = mapped_column(Integer, primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    slot: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    submissions: Mapped[int] = mapped_column(BigInteger, default=0)
+
+
+class ContentStepUser(Base):
+    """Submissions of each user per step, tells when a user starts or stops counting for a step."""
+
+    __tablename__ = "content_step_user"
+
+    step_number: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[uuid.UUID] = mapped_column(primary_key=True)
+    submissions: Mapped[int] = mapped_column(BigInteger, default=0)
+
+
+event.listen(Content.__table__, "after_create", create_partitions_on_table_create)
+
+# Trigram indexes need the extension, migrations create it explicitly, this covers metadata.create_all()
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+# Statistics triggers reference the summary tables, so they are created after all tables
+for ddl in STEP_STATS_DDL:
+    event.listen(Base.metadata, "after_create", ddl.execute_if(dialect="postgresql"))
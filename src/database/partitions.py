@@ -0,0 +1,99 @@
+import re
+from collections.abc import Iterable
+from datetime import UTC, date, datetime
+
+from loguru import logger
+from sqlalchemy import Connection, TextClause, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.config.settings import settings
+
+PARTITION_NAME = re.compile(r"_p(?P<year>\d{4})_(?P<month>\d{2})$")
+
+LIST_PARTITIONS_QUERY = text(
+    """
+    SELECT child.relname
+    FROM pg_inherits
+    JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+    JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+    WHERE parent.relname = :table
+    """
+)
+
+# Partition tables that were detached from their parent, e.g. by an interrupted archive run
+LIST_DETACHED_QUERY = text(
+    """
+    SELECT relname
+    FROM pg_class
+    WHERE relkind = 'r'
+      AND relnamespace = 'public'::regnamespace
+      AND NOT relispartition
+      AND starts_with(relname, :prefix)
+    """
+)
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y_%m}"
+
+
+def create_partition_ddl(table: str, month: date) -> TextClause:
+    """Monthly range partition, bounds are UTC midnights of the first days of the months."""
+    return text(
+        f'CREATE TABLE IF NOT EXISTS "{partition_name(table, month)}" PARTITION OF "{table}" '
+        f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{add_months(month, 1).isoformat()} 00:00:00+00')"
+    )
+
+
+def upcoming_months(months_ahead: int) -> list[date]:
+    """Current month and `months_ahead` following months."""
+    current = month_start(datetime.now(UTC).date())
+    return [add_months(current, offset) for offset in range(months_ahead + 1)]
+
+
+def create_partitions_on_table_create(target: object, connection: Connection, **kwargs: object) -> None:
+    """`after_create` listener, so tables made by `metadata.create_all()` accept inserts right away."""
+    table = str(getattr(target, "name", ""))
+    for month in upcoming_months(settings.PARTITION_MONTHS_AHEAD):
+        connection.execute(create_partition_ddl(table, month))
+
+
+async def ensure_partitions(
+    connection: AsyncConnection,
+    table: str,
+    months_ahead: int = settings.PARTITION_MONTHS_AHEAD,
+) -> None:
+    """Create partitions for the current and the following `months_ahead` months if they are missing."""
+    for month in upcoming_months(months_ahead):
+        await connection.execute(create_partition_ddl(table, month))
+    logger.info(f"Partitions of {table} exist up to {add_months(upcoming_months(months_ahead)[-1], 1)}")
+
+
+async def list_partitions(connection: AsyncConnection, table: str) -> list[tuple[str, date]]:
+    """Monthly partitions of the table as (name, first day of the month), oldest first."""
+    result = await connection.execute(LIST_PARTITIONS_QUERY, {"table": table})
+    return parse_partitions(result.scalars())
+
+
+async def list_detached_partitions(connection: AsyncConnection, table: str) -> list[tuple[str, date]]:
+    """Tables named like monthly partitions of the table that are not attached to it, oldest first."""
+    result = await connection.execute(LIST_DETACHED_QUERY, {"prefix": f"{table}_p"})
+    return parse_partitions(result.scalars())
+
+
+def parse_partitions(names: Iterable[str]) -> list[tuple[str, date]]:
+    partitions = []
+    for name in names:
+        match = PARTITION_NAME.search(name)
+        if match is not None:
+            partitions.append((name, date(int(match["year"]), int(match["month"]), 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
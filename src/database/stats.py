@@ -0,0 +1,98 @@
+"""Per-step statistics of content, maintained incrementally by statement-level triggers.
+
+Every INSERT, UPDATE and DELETE on `content` (bot handlers, the write coalescer, `CrudEntity`
+and the admin) passes its transition tables to a trigger that applies the per-step deltas to
+small summary tables, one upsert per touched step, day and user. Step totals and daily
+counts are split over `STATS_SLOTS` rows picked by backend pid, so concurrent writers to the
+same step rarely wait for each other's row lock, and readers sum the slots. Reading the
+dashboard then costs a lookup of at most `steps * days * STATS_SLOTS` rows, however large
+`content` grows. Partitions moved to the archive are dropped without DELETE, so archived
+content stays counted.
+"""
+
+from sqlalchemy import DDL
+
+STATS_SLOTS = 16
+
+INSERT_CHANGES = "SELECT step_number, user_id, created_at, 1 AS delta FROM new_rows"
+DELETE_CHANGES = "SELECT step_number, user_id, created_at, -1 AS delta FROM old_rows"
+
+# One statement: data-modifying CTEs all run, `users` returns the new per-user counts so the
+# number of distinct users of a step changes only when a count crosses zero
+APPLY_CHANGES = """
+WITH changes AS ({changes}),
+user_deltas AS (
+    SELECT step_number, user_id, sum(delta) AS delta
+    FROM changes
+    GROUP BY step_number, user_id
+    HAVING sum(delta) <> 0
+),
+users AS (
+    INSERT INTO content_step_user AS t (step_number, user_id, submissions)
+    SELECT step_number, user_id, delta FROM user_deltas ORDER BY step_number, user_id
+    ON CONFLICT (step_number, user_id) DO UPDATE SET submissions = t.submissions + excluded.submissions
+    RETURNING t.step_number, t.user_id, t.submissions
+),
+totals AS (
+    INSERT INTO content_step_totals AS t (step_number, slot, users, submissions)
+    SELECT
+        users.step_number,
+        {slot},
+        sum(
+            CASE
+                WHEN users.submissions > 0 AND users.submissions - user_deltas.delta <= 0 THEN 1
+                WHEN users.submissions <= 0 AND users.submissions - user_deltas.delta > 0 THEN -1
+                ELSE 0
+            END
+        ),
+        sum(user_deltas.delta)
+    FROM users JOIN user_deltas USING (step_number, user_id)
+    GROUP BY users.step_number
+    ORDER BY users.step_number
+    ON CONFLICT (step_number, slot) DO UPDATE
+    SET users = t.users + excluded.users, submissions = t.submissions + excluded.submissions
+)
+INSERT INTO content_step_daily AS t (step_number, day, slot, submissions)
+SELECT step_number, (created_at AT TIME ZONE 'UTC')::date, {slot}, sum(delta)
+FROM changes
+GROUP BY 1, 2
+HAVING sum(delta) <> 0
+ORDER BY 1, 2
+ON CONFLICT (step_number, day, slot) DO UPDATE SET submissions = t.submissions + excluded.submissions
+"""
+
+SLOT = f"mod(pg_backend_pid(), {STATS_SLOTS})"
+
+TRIGGER_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION content_step_stats() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        {APPLY_CHANGES.format(changes=INSERT_CHANGES, slot=SLOT)};
+    ELSIF TG_OP = 'DELETE' THEN
+        {APPLY_CHANGES.format(changes=DELETE_CHANGES, slot=SLOT)};
+    ELSE
+        {APPLY_CHANGES.format(changes=f"{INSERT_CHANGES} UNION ALL {DELETE_CHANGES}", slot=SLOT)};
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+# Transition tables can't be shared by triggers on several events, so there is one per event
+TRIGGERS = {
+    "INSERT": "REFERENCING NEW TABLE AS new_rows",
+    "UPDATE": "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows",
+    "DELETE": "REFERENCING OLD TABLE AS old_rows",
+}
+
+# Idempotent, metadata `after_create` fires on every `create_all()`, even when all tables existed
+STEP_STATS_DDL = [
+    DDL(TRIGGER_FUNCTION),
+    *(
+        DDL(
+            f"CREATE OR REPLACE TRIGGER content_step_stats_{event.lower()} AFTER {event} ON content "
+            f"{referencing} FOR EACH STATEMENT EXECUTE FUNCTION content_step_stats()"
+        )
+        for event, referencing in TRIGGERS.items()
+    ),
+]
@@ -1,30 +1,50 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from pathlib import Path
 
 from fastapi import FastAPI
 from sqladmin import Admin
 
 from src.admin.auth import authentication_backend
 from src.admin.models import ContentAdmin, UserAdmin
+from src.admin.views import StepStatsView
+from src.api.content import router as content_api_router
+from src.api.export import router as export_router
+from src.api.uploads import router as uploads_router
 from src.database.config import dbconfig
+from src.storage.uploads import expire_uploads_periodically
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for FastAPI application."""
-    # Initialize database models
+    # Database engine and storage client are created lazily on first use
+    replica_monitor = asyncio.create_task(dbconfig.monitor_replicas())
+    uploads_cleanup = asyncio.create_task(expire_uploads_periodically())
     yield
+    for task in (uploads_cleanup, replica_monitor):
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await dbconfig.dispose()
 
 
 app = FastAPI(lifespan=lifespan)
+app.include_router(content_api_router)
+app.include_router(export_router)
+app.include_router(uploads_router)
 
 # Initialize admin interface
 admin = Admin(
     app,
-    dbconfig.engine,
+    # sqladmin reconfigures the sessionmaker it gets, so it must not share one with the API
+    session_maker=dbconfig.create_read_session_maker(),
     authentication_backend=authentication_backend,
     title="Content Management",
+    templates_dir=str(Path(__file__).parent / "admin" / "templates"),
 )
 
 # Add model views
 admin.add_view(UserAdmin)
 admin.add_view(ContentAdmin)
+admin.add_view(StepStatsView)
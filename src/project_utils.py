@@ -2,8 +2,9 @@ import re
 from types import TracebackType
 from typing import NoReturn
 
-from fastapi import HTTPException, status
 from sqlalchemy.exc import NoResultFound, SQLAlchemyError
+from starlette import status
+from starlette.exceptions import HTTPException
 
 
 def handle_error(
@@ -0,0 +1,236 @@
+"""Cold archive for old partitions of partitioned tables.
+
+Partitions older than `PARTITION_RETENTION_MONTHS` are exported to `MINIO_ARCHIVE_BUCKET` as
+gzipped JSON lines, their rows are recorded in `archived_row`, then the partitions are detached
+and dropped, all in one transaction that blocks writes to the partition, so every row is
+either in the live table or in the archive. Archives are written in gzip members of
+`BLOCK_ROWS` rows and `archived_row` keeps the byte range of the member holding each row,
+so loading an archived row downloads and decompresses one block instead of the whole month.
+Run periodically (e.g. daily from cron):
+
+    python -m src.storage.archive
+"""
+
+import asyncio
+import gzip
+import json
+import tempfile
+import uuid
+from collections.abc import Iterable
+from datetime import UTC, date, datetime
+from pathlib import Path
+from typing import Any
+from typing import cast as type_cast
+
+from loguru import logger
+from sqlalchemy import Table, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.config.settings import settings
+from src.database.config import ModelType, dbconfig
+from src.database.models import ArchivedRow, Content
+from src.database.partitions import (
+    add_months,
+    ensure_partitions,
+    list_detached_partitions,
+    list_partitions,
+    month_start,
+)
+from src.storage.minio import ensure_bucket, get_minio_client
+
+BLOCK_ROWS = 1000
+INSERT_BATCH_SIZE = 10_000
+
+# (row id, byte offset, byte length) of the gzip member holding the row
+RowLocation = tuple[uuid.UUID, int, int]
+
+
+def archive_object_name(table: str, month: date) -> str:
+    return f"{table}/{month:%Y_%m}.jsonl.gz"
+
+
+async def export_partition(
+    connection: AsyncConnection,
+    partition: str,
+    columns: list[str],
+    path: Path,
+) -> list[RowLocation]:
+    """
+    Stream partition rows through a server-side cursor into a gzipped JSON lines file made of
+    independent gzip members of `BLOCK_ROWS` rows, return where each row ended up.
+    """
+    column_list = ", ".join(f'"{column}"' for column in columns)
+    result = await connection.stream(text(f'SELECT {column_list} FROM "{partition}"'))  # noqa: S608
+
+    locations: list[RowLocation] = []
+    with path.open("wb") as archive:
+
+        def write_block(lines: list[str], row_ids: list[uuid.UUID]) -> None:
+            offset = archive.tell()
+            length = archive.write(gzip.compress("".join(lines).encode()))
+            locations.extend((row_id, offset, length) for row_id in row_ids)
+
+        lines: list[str] = []
+        row_ids: list[uuid.UUID] = []
+        async for row in result.mappings():
+            lines.append(json.dumps(dict(row), default=str, ensure_ascii=False) + "\n")
+            row_ids.append(row["id"])
+            if len(lines) == BLOCK_ROWS:
+                write_block(lines, row_ids)
+                lines, row_ids = [], []
+        if lines:
+            write_block(lines, row_ids)
+    return locations
+
+
+async def record_archived_rows(
+    connection: AsyncConnection,
+    table: str,
+    object_name: str,
+    locations: list[RowLocation],
+) -> None:
+    statement = insert(ArchivedRow)
+    statement = statement.on_conflict_do_update(
+        index_elements=[ArchivedRow.table_name, ArchivedRow.row_id],
+        set_={
+            "object_name": statement.excluded.object_name,
+            "block_offset": statement.excluded.block_offset,
+            "block_length": statement.excluded.block_length,
+            "archived_at": statement.excluded.archived_at,
+        },
+    )
+    archived_at = datetime.now(UTC)
+    for start in range(0, len(locations), INSERT_BATCH_SIZE):
+        rows = [
+            {
+                "table_name": table,
+                "row_id": row_id,
+                "object_name": object_name,
+                "block_offset": offset,
+                "block_length": length,
+                "archived_at": archived_at,
+            }
+            for row_id, offset, length in locations[start : start + INSERT_BATCH_SIZE]
+        ]
+        await connection.execute(statement, rows)
+
+
+async def archive_partition(table: Table, partition: str, month: date, detached: bool = False) -> None:
+    """
+    Export the partition to the archive bucket, index its rows, detach and drop it in one transaction.
+    The SHARE lock lets readers through but holds writers until the partition is gone, so no write
+    is lost, and a failed run leaves the rows in place. `detached` partitions of earlier versions
+    of this job are archived the same way without the detach.
+    """
+    bucket_name = settings.MINIO_ARCHIVE_BUCKET
+    object_name = archive_object_name(table.name, month)
+    columns = [column.name for column in table.columns if column.computed is None]
+
+    async with dbconfig.engine.begin() as connection:
+        await connection.execute(text(f'LOCK TABLE "{partition}" IN SHARE MODE'))
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "partition.jsonl.gz"
+            locations = await export_partition(connection, partition, columns, path)
+            await ensure_bucket(bucket_name)
+            await get_minio_client().fput_object(bucket_name, object_name, str(path))
+
+        await record_archived_rows(connection, table.name, object_name, locations)
+        if not detached:
+            await connection.execute(text(f'ALTER TABLE "{table.name}" DETACH PARTITION "{partition}"'))
+        await connection.execute(text(f'DROP TABLE "{partition}"'))
+    logger.info(f"Archived {len(locations)} rows of {partition} to {bucket_name}/{object_name}")
+
+
+async def maintain_partitions(table: Table, retention_months: int = settings.PARTITION_RETENTION_MONTHS) -> None:
+    """Create upcoming partitions and archive the ones older than the retention period."""
+    async with dbconfig.engine.begin() as connection:
+        await ensure_partitions(connection, table.name)
+        partitions = await list_partitions(connection, table.name)
+        detached = await list_detached_partitions(connection, table.name)
+
+    oldest_kept = add_months(month_start(datetime.now(UTC).date()), -retention_months)
+    for partition, month in detached:
+        # Only leftovers of the archive job itself, other tables named like partitions are left alone
+        if month < oldest_kept:
+            await archive_partition(table, partition, month, detached=True)
+
+    for partition, month in partitions:
+        if month < oldest_kept:
+            await archive_partition(table, partition, month)
+
+
+async def load_archived_row(
+    object_name: str,
+    row_id: uuid.UUID,
+    block_offset: int | None = None,
+    block_length: int | None = None,
+) -> dict[str, Any] | None:
+    """
+    Find a row in an archive object. With the location of its block only that block is downloaded,
+    archives written before blocks were indexed are scanned line by line so memory use stays flat.
+    """
+    needle = str(row_id)
+    if block_offset is not None and block_length is not None:
+        response = await get_minio_client().get_object(
+            settings.MINIO_ARCHIVE_BUCKET,
+            object_name,
+            offset=block_offset,
+            length=block_length,
+        )
+        try:
+            block = gzip.decompress(await response.read()).decode()
+        finally:
+            response.release()
+        return find_row(block.splitlines(), needle)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "archive.jsonl.gz"
+        await get_minio_client().fget_object(settings.MINIO_ARCHIVE_BUCKET, object_name, str(path))
+        with gzip.open(path, "rt", encoding="utf-8") as archive:
+            return find_row(archive, needle)
+
+
+def find_row(lines: Iterable[str], needle: str) -> dict[str, Any] | None:
+    for line in lines:
+        if needle not in line:
+            continue
+        row = json.loads(line)
+        if row.get("id") == needle:
+            return row
+    return None
+
+
+async def load_archived_entity(model: type[ModelType], row_id: uuid.UUID) -> ModelType | None:
+    """Load a row moved to the archive bucket, the returned instance is not attached to any session."""
+    table = type_cast("Table", model.__table__)
+    query = select(ArchivedRow).where(ArchivedRow.table_name == table.name, ArchivedRow.row_id == row_id)
+    async with dbconfig.read_session() as session:
+        archived = (await session.execute(query)).scalar_one_or_none()
+    if archived is None:
+        return None
+
+    row = await load_archived_row(archived.object_name, row_id, archived.block_offset, archived.block_length)
+    if row is None:
+        logger.warning(f"{table.name} row {row_id} is indexed in {archived.object_name} but missing from the archive")
+        return None
+    return model(**decode_row(table, row))
+
+
+def decode_row(table: Table, row: dict[str, Any]) -> dict[str, Any]:
+    """Convert JSON values of an archived row back to column python types."""
+    values = {}
+    for column in table.columns:
+        if column.name not in row:
+            continue
+        value = row[column.name]
+        if value is not None and column.type.python_type is uuid.UUID:
+            value = uuid.UUID(value)
+        elif value is not None and column.type.python_type is datetime:
+            value = datetime.fromisoformat(value)
+        values[column.key] = value
+    return values
+
+
+if __name__ == "__main__":
+    asyncio.run(maintain_partitions(Content.__table__))  # pyright: ignore[reportArgumentType]
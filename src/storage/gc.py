@@ -0,0 +1,191 @@
+"""Garbage collection of objects in the public bucket that no content references.
+
+Referenced object names are collected from `content` (a server-side cursor, so the table
+is never loaded at once), resumable uploads that can still be attached and archived content
+partitions into a set, or into a Bloom filter for large tables. Then the bucket is listed page by page and
+unreferenced objects older than the grace period are deleted in batches of up to 1000.
+A Bloom filter false positive only keeps an orphan until the next run, so it never deletes
+a referenced object.
+
+    python -m src.storage.gc --dry-run
+"""
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import math
+import tempfile
+import time
+from collections.abc import AsyncIterator
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Protocol
+
+from loguru import logger
+from sqlalchemy import ColumnElement, func, or_, select
+
+from src.config.settings import settings
+from src.database.config import dbconfig
+from src.database.models import ArchivedRow, Content, Upload
+from src.storage.minio import delete_files, get_minio_client, object_name_from_url
+
+REMOVE_OBJECTS_BATCH_SIZE = 1000  # maximum keys per multi-object delete request
+EXACT_SET_MAX_KEYS = 1_000_000
+
+
+class KeySet(Protocol):
+    def add(self, key: str, /) -> None: ...
+
+    def __contains__(self, key: str, /) -> bool: ...
+
+
+class BloomFilter:
+    """Set membership with false positives only, memory is fixed by capacity and error rate."""
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        capacity = max(capacity, 1)
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str) -> list[int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8]), int.from_bytes(digest[8:]) | 1
+        return [(first + index * second) % self.size for index in range(self.hashes)]
+
+    def add(self, key: str, /) -> None:
+        for position in self._positions(key):
+            self.bits[position // 8] |= 1 << position % 8
+
+    def __contains__(self, key: str, /) -> bool:
+        return all(self.bits[position // 8] & (1 << position % 8) for position in self._positions(key))
+
+
+@dataclass
+class GCStats:
+    referenced: int = 0
+    listed: int = 0
+    skipped_recent: int = 0
+    orphaned: int = 0
+    deleted: int = 0
+    errors: int = 0
+    elapsed_s: float = 0.0
+    listed_per_s: float = 0.0
+    deleted_per_s: float = 0.0
+
+
+def attachable_uploads() -> ColumnElement[bool]:
+    """Unfinished uploads and finished ones that can still be attached to content by id."""
+    cutoff = datetime.now(UTC) - timedelta(hours=settings.UPLOAD_EXPIRATION_HOURS)
+    return or_(Upload.completed_at.is_(None), Upload.completed_at >= cutoff)
+
+
+async def iter_referenced_objects() -> AsyncIterator[str]:
+    """Object names referenced by content rows, recent uploads and archived content."""
+    async with dbconfig.read_session() as session:
+        result = await session.stream(select(Content.content).execution_options(yield_per=10_000))
+        async for url in result.scalars():
+            object_name = object_name_from_url(url)
+            if object_name is not None:
+                yield object_name
+
+        query = select(Upload.object_name).where(attachable_uploads())
+        result = await session.stream(query.execution_options(yield_per=10_000))
+        async for object_name in result.scalars():
+            yield object_name
+
+    async for object_name in iter_archived_references():
+        yield object_name
+
+
+async def iter_archived_references() -> AsyncIterator[str]:
+    """Archived content rows still point to their files, archives are scanned one by one."""
+    client = get_minio_client()
+    if not await client.bucket_exists(settings.MINIO_ARCHIVE_BUCKET):
+        return
+
+    table = Content.__tablename__
+    async for archive in client.list_objects(settings.MINIO_ARCHIVE_BUCKET, prefix=f"{table}/", recursive=True):
+        if archive.object_name is None:
+            continue
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "archive.jsonl.gz"
+            await client.fget_object(settings.MINIO_ARCHIVE_BUCKET, archive.object_name, str(path))
+            with gzip.open(path, "rt", encoding="utf-8") as lines:
+                for line in lines:
+                    object_name = object_name_from_url(json.loads(line).get("content") or "")
+                    if object_name is not None:
+                        yield object_name
+
+
+async def collect_referenced(error_rate: float) -> tuple[KeySet, int]:
+    archived = select(func.count()).where(ArchivedRow.table_name == Content.__tablename__)
+    async with dbconfig.read_session() as session:
+        expected = await session.scalar(select(func.count()).select_from(Content)) or 0
+        expected += await session.scalar(select(func.count()).where(attachable_uploads())) or 0
+        expected += await session.scalar(archived) or 0
+
+    keys: KeySet = set() if expected <= EXACT_SET_MAX_KEYS else BloomFilter(expected * 2, error_rate)
+    count = 0
+    async for object_name in iter_referenced_objects():
+        keys.add(object_name)
+        count += 1
+    return keys, count
+
+
+async def collect_garbage(dry_run: bool, min_age: timedelta, error_rate: float = 0.001) -> GCStats:
+    """Delete unreferenced objects older than `min_age` from the public bucket."""
+    started = time.perf_counter()
+    stats = GCStats()
+    # Objects uploaded after this moment may belong to content that is being saved right now
+    cutoff = datetime.now(UTC) - min_age
+
+    referenced, stats.referenced = await collect_referenced(error_rate)
+
+    async def flush(batch: list[str]) -> None:
+        stats.orphaned += len(batch)
+        if dry_run:
+            return
+        failed = await delete_files(batch)
+        stats.deleted += len(batch) - len(failed)
+        stats.errors += len(failed)
+        for object_name in failed:
+            logger.warning(f"Failed to delete {object_name}")
+
+    batch: list[str] = []
+    async for item in get_minio_client().list_objects(settings.MINIO_PUBLIC_BUCKET, recursive=True):
+        stats.listed += 1
+        # Listing entries without a name can't be checked or deleted
+        if item.object_name is None or item.object_name in referenced:
+            continue
+        if item.last_modified is not None and item.last_modified > cutoff:
+            stats.skipped_recent += 1
+            continue
+        batch.append(item.object_name)
+        if len(batch) == REMOVE_OBJECTS_BATCH_SIZE:
+            await flush(batch)
+            batch = []
+    if batch:
+        await flush(batch)
+
+    stats.elapsed_s = time.perf_counter() - started
+    stats.listed_per_s = stats.listed / stats.elapsed_s
+    stats.deleted_per_s = stats.deleted / stats.elapsed_s
+    return stats
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="Only report orphaned objects")
+    parser.add_argument("--min-age-hours", type=float, default=24, help="Keep objects younger than this")
+    parser.add_argument("--error-rate", type=float, default=0.001, help="False positive rate of the Bloom filter")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    result = asyncio.run(collect_garbage(args.dry_run, timedelta(hours=args.min_age_hours), args.error_rate))
+    logger.info(f"Garbage collection {'(dry run) ' if args.dry_run else ''}finished: {asdict(result)}")
@@ -1,15 +1,48 @@
-from typing import BinaryIO
-
-from miniopy_async import Minio
+import base64
+from collections.abc import AsyncIterator
+from datetime import datetime
+from functools import cache
+from typing import TYPE_CHECKING, BinaryIO
 
 from src.config.settings import settings
 
-minio_client = Minio(
-    settings.MINIO_ENDPOINT,
-    access_key=settings.MINIO_ACCESS_KEY,
-    secret_key=settings.MINIO_SECRET_KEY,
-    secure=settings.MINIO_SECURE,
-)
+if TYPE_CHECKING:
+    from miniopy_async.api import Minio
+    from miniopy_async.helpers import DictType
+
+
+@cache
+def get_minio_client() -> "Minio":
+    """Create minio client on first use, importing the SDK only when storage is needed."""
+    from miniopy_async.api import Minio
+
+    return Minio(
+        settings.MINIO_ENDPOINT,
+        access_key=settings.MINIO_ACCESS_KEY,
+        secret_key=settings.MINIO_SECRET_KEY,
+        secure=settings.MINIO_SECURE,
+    )
+
+
+def object_url(object_name: str) -> str:
+    """URL stored in content for an object of the public bucket."""
+    return f"{settings.MINIO_ENDPOINT}/{settings.MINIO_PUBLIC_BUCKET}/{object_name}"
+
+
+def object_name_from_url(url: str) -> str | None:
+    """Object name of the public bucket referenced by `url`, None for any other value."""
+    prefix = object_url("")
+    if not url.startswith(prefix):
+        return None
+    return url.removeprefix(prefix) or None
+
+
+async def ensure_bucket(bucket_name: str) -> None:
+    """Create bucket if it doesn't exist yet."""
+    minio_client = get_minio_client()
+    bucket_exists = await minio_client.bucket_exists(bucket_name)
+    if not bucket_exists:
+        await minio_client.make_bucket(bucket_name)
 
 
 async def upload_file(file: BinaryIO, object_name: str) -> str:
@@ -22,12 +55,9 @@ async def upload_file(file: BinaryIO, object_name: str) -> str:
     Returns:
         str: URL of the uploaded file.
     """
+    minio_client = get_minio_client()
     bucket_name = settings.MINIO_PUBLIC_BUCKET
-
-    # Ensure bucket exists
-    bucket_exists = await minio_client.bucket_exists(bucket_name)
-    if not bucket_exists:
-        await minio_client.make_bucket(bucket_name)
+    await ensure_bucket(bucket_name)
 
     # Upload file
     await minio_client.put_object(
@@ -39,7 +69,7 @@ async def upload_file(file: BinaryIO, object_name: str) -> str:
     )
     # TODO: Change return file url like https://minio.dip-analytics.ru/public/1234567890.pdf
 
-    return f"{settings.MINIO_ENDPOINT}/{bucket_name}/{object_name}"
+    return object_url(object_name)
 
 
 async def delete_file(object_name: str) -> None:
@@ -48,4 +78,78 @@ async def delete_file(object_name: str) -> None:
     Args:
         object_name: Name of the object in minio storage.
     """
-    await minio_client.remove_object(settings.MINIO_PUBLIC_BUCKET, object_name)
+    await get_minio_client().remove_object(settings.MINIO_PUBLIC_BUCKET, object_name)
+
+
+async def delete_files(object_names: list[str]) -> list[str]:
+    """Delete up to 1000 objects with one request. Returns names of objects that failed to delete."""
+    from miniopy_async.deleteobjects import DeleteObject
+
+    errors = get_minio_client().remove_objects(
+        settings.MINIO_PUBLIC_BUCKET,
+        [DeleteObject(object_name) for object_name in object_names],
+    )
+    return [error.name async for error in errors if error.name is not None]
+
+
+# Multipart uploads, the SDK exposes them only through its internal methods used by put_object
+
+
+async def create_multipart_upload(object_name: str) -> str:
+    """Start multipart upload in the public bucket and return its id."""
+    bucket_name = settings.MINIO_PUBLIC_BUCKET
+    await ensure_bucket(bucket_name)
+    return await get_minio_client()._create_multipart_upload(bucket_name, object_name, {})
+
+
+async def upload_part(object_name: str, upload_id: str, part_number: int, data: bytes, md5: bytes) -> str:
+    """Upload one part, MinIO verifies it against `md5`. Returns the part etag."""
+    headers: DictType = {"Content-MD5": base64.b64encode(md5).decode()}
+    return await get_minio_client()._upload_part(
+        settings.MINIO_PUBLIC_BUCKET,
+        object_name,
+        data,
+        headers,
+        upload_id,
+        part_number,
+    )
+
+
+async def complete_multipart_upload(object_name: str, upload_id: str, parts: list[tuple[int, str]]) -> str:
+    """Assemble uploaded parts into the object and return its URL."""
+    from miniopy_async.datatypes import Part
+
+    bucket_name = settings.MINIO_PUBLIC_BUCKET
+    await get_minio_client()._complete_multipart_upload(
+        bucket_name,
+        object_name,
+        upload_id,
+        [Part(part_number, etag) for part_number, etag in parts],
+    )
+    return object_url(object_name)
+
+
+async def abort_multipart_upload(object_name: str, upload_id: str) -> None:
+    """Abort multipart upload and free the space taken by its parts."""
+    await get_minio_client()._abort_multipart_upload(settings.MINIO_PUBLIC_BUCKET, object_name, upload_id)
+
+
+async def list_multipart_uploads(prefix: str) -> AsyncIterator[tuple[str, str, datetime | None]]:
+    """Unfinished multipart uploads under `prefix` as (object name, upload id, initiated time)."""
+    key_marker = None
+    upload_id_marker = None
+    while True:
+        result = await get_minio_client()._list_multipart_uploads(
+            settings.MINIO_PUBLIC_BUCKET,
+            prefix=prefix,
+            key_marker=key_marker,
+            upload_id_marker=upload_id_marker,
+        )
+        for upload in result.uploads:
+            # Entries of a malformed listing can't be aborted anyway
+            if upload.object_name is not None and upload.upload_id is not None:
+                yield upload.object_name, upload.upload_id, upload.initiated_time
+        if not result.is_truncated:
+            return
+        key_marker = result.next_key_marker
+        upload_id_marker = result.next_upload_id_marker
@@ -0,0 +1,94 @@
+"""Cleanup of abandoned resumable uploads.
+
+Unfinished uploads without progress for `UPLOAD_EXPIRATION_HOURS` are aborted, so their parts
+don't take space in the bucket, and multipart uploads unknown to the database (e.g. left by
+a crash between creating the upload and saving its row) are aborted as well. Rows of uploads
+finished earlier than that are deleted, they can no longer be attached to content.
+The API runs the cleanup periodically, it can also be run manually:
+
+    python -m src.storage.uploads
+"""
+
+import asyncio
+from datetime import UTC, datetime, timedelta
+from uuid import UUID
+
+from loguru import logger
+from sqlalchemy import delete, func, select
+
+from src.config.settings import settings
+from src.database.config import dbconfig
+from src.database.models import Upload
+from src.storage.minio import abort_multipart_upload, list_multipart_uploads
+
+UPLOADS_PREFIX = "uploads/"
+
+
+async def get_completed_upload_url(upload_id: UUID) -> str:
+    """
+    URL of a resumable upload finished within `UPLOAD_EXPIRATION_HOURS`, older uploads
+    that no content references are removed by the garbage collector.
+    """
+    cutoff = datetime.now(UTC) - timedelta(hours=settings.UPLOAD_EXPIRATION_HOURS)
+    async with dbconfig.async_session_maker() as session:
+        query = select(Upload.url).where(Upload.id == upload_id, Upload.completed_at >= cutoff)
+        url = (await session.execute(query)).scalar_one_or_none()
+    if url is None:
+        raise ValueError(f"Upload {upload_id} doesn't exist, isn't finished yet or has expired")
+    return url
+
+
+async def abort_quietly(object_name: str, upload_id: str) -> None:
+    from aiohttp import ClientError
+    from miniopy_async.error import MinioException
+
+    try:
+        await abort_multipart_upload(object_name, upload_id)
+    except (MinioException, ClientError) as error:
+        logger.warning(f"Failed to abort multipart upload of {object_name}: {error!r}")
+
+
+async def expire_uploads() -> int:
+    """Abort expired and orphaned multipart uploads, return how many were aborted."""
+    cutoff = datetime.now(UTC) - timedelta(hours=settings.UPLOAD_EXPIRATION_HOURS)
+    aborted = 0
+
+    async with dbconfig.async_session_maker() as session, session.begin():
+        query = (
+            select(Upload)
+            .where(Upload.completed_at.is_(None), func.coalesce(Upload.updated_at, Upload.created_at) < cutoff)
+            .with_for_update(skip_locked=True)
+        )
+        for upload in (await session.execute(query)).scalars():
+            await abort_quietly(upload.object_name, upload.multipart_upload_id)
+            await session.delete(upload)
+            aborted += 1
+
+        # Finished uploads can't be attached anymore, their objects live on as long as content references them
+        await session.execute(delete(Upload).where(Upload.completed_at < cutoff))
+
+    async with dbconfig.async_session_maker() as session:
+        query = select(Upload.multipart_upload_id).where(Upload.completed_at.is_(None))
+        known = set((await session.execute(query)).scalars())
+
+    async for object_name, upload_id, initiated_at in list_multipart_uploads(UPLOADS_PREFIX):
+        if upload_id not in known and (initiated_at is None or initiated_at < cutoff):
+            await abort_quietly(object_name, upload_id)
+            aborted += 1
+
+    if aborted:
+        logger.info(f"Aborted {aborted} abandoned uploads")
+    return aborted
+
+
+async def expire_uploads_periodically(interval: float = 3600) -> None:
+    while True:
+        try:
+            await expire_uploads()
+        except Exception:  # noqa: BLE001 (a failed run must not stop the cleanup for the app's lifetime)
+            logger.exception("Upload cleanup failed")
+        await asyncio.sleep(interval)
+
+
+if __name__ == "__main__":
+    asyncio.run(expire_uploads())